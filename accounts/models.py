@@ -60,6 +60,10 @@ class User(AbstractBaseUser, PermissionsMixin, DocumentBase):
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = ['email']
 
+    # kept out of revision diffs and the revision feed
+    PRIVATE_FIELDS = ('password', 'email', 'last_login',
+                      'is_superuser', 'is_staff')
+
     class Meta:
         unique_together = ("is_tip", "username")
         verbose_name = _('user')
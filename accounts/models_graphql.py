@@ -6,11 +6,13 @@ from django.utils.translation import ugettext_lazy as _
 
 import graphene
 from graphene.relay import Node
-from graphene_django import DjangoObjectType, DjangoConnectionField
-from graphene_django.filter import DjangoFilterConnectionField
+from graphene_django import DjangoObjectType
 
 from db.types import DocumentBase
-from db.graphene import CountedConnection
+from db.counting import CACHED
+from db.graphene import (
+    CountedConnection, DjangoConnectionField, DjangoFilterConnectionField
+)
 
 from images.fields import Thumbnail
 from backend.fields import GetBy
@@ -37,7 +39,8 @@ class User(DjangoObjectType, DocumentBase):
     is_authenticated = graphene.Boolean()
     avatar = Thumbnail()
 
-    actions = DjangoConnectionField(get_revision_type)
+    actions = DjangoConnectionField(get_revision_type,
+                                    count_strategy=CACHED)
 
     collection_list = DjangoConnectionField(get_collection_item_type)
     wish_list = DjangoConnectionField(get_wish_item_type)
@@ -59,7 +62,7 @@ class User(DjangoObjectType, DocumentBase):
 
     def resolve_email(self, info):
         if info.context.user.is_authenticated and\
-            (self.document == info.context.user.document or
+            (self.document_id == info.context.user.document_id or
                 info.context.user.is_superuser):
             return self.email
         return _("Você não tem permissão")
@@ -72,7 +75,7 @@ class User(DjangoObjectType, DocumentBase):
     def resolve_actions(self, info, **kwargs):
         Revision = get_revision_type()
         return Revision._meta.model.objects.filter(
-            author_id=self.document.pk).order_by('-created_at')
+            author_id=self.document_id).order_by('-created_at')
 
     def resolve_collection_list(self, info, **kwargs):
         CollectionItem = get_collection_item_type()
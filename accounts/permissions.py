@@ -1,4 +1,6 @@
 from backend.fields import Error
+from db.loaders import get_loaders
+from db.reputations import get_perms
 from django.utils.translation import ugettext_lazy as _
 
 PermissionRequired = Error(
@@ -7,5 +9,6 @@ PermissionRequired = Error(
 )
 
 def has_permission(cls, request, obj, perm):
-    if perm not in obj.get_my_perms(request.user):
+    creator_id = get_loaders(request).creator_id(obj.document_id)
+    if perm not in get_perms(obj, request.user, creator_id):
         return cls(errors=[PermissionRequired])
@@ -0,0 +1,139 @@
+"""
+Static cost of an operation, computed from the validated AST before it is
+executed.
+
+Every field with a selection set costs 1 (or its weight in
+`GRAPHQL_COST_WEIGHTS`, keyed by "Type.field"), scalars cost 0 unless
+weighted. The cost of the selections of a field taking `first`/`last` is
+multiplied by that argument, or by `GRAPHQL_COST_DEFAULT_LIMIT`, the
+expected size of a page, when neither is given. Variables missing from the
+request take the default of their definition in the operation.
+"""
+from graphql.language import ast
+from graphql.type.definition import get_named_type
+
+
+def get_argument(field, name, variables):
+    for argument in field.arguments or ():
+        if argument.name.value != name:
+            continue
+        value = argument.value
+        if isinstance(value, ast.Variable):
+            return (variables or {}).get(value.name.value)
+        if isinstance(value, ast.IntValue):
+            return int(value.value)
+    return None
+
+
+def get_variables(operation, variables):
+    """
+    `variables` completed with the integer defaults of the operation's
+    variable definitions, the only ones the cost depends on.
+    """
+    values = {}
+    for definition in operation.variable_definitions or ():
+        if isinstance(definition.default_value, ast.IntValue):
+            values[definition.variable.name.value] = int(
+                definition.default_value.value)
+    values.update(variables or {})
+    return values
+
+
+def get_multiplier(field_def, field, variables, default_limit):
+    if 'first' not in field_def.args and 'last' not in field_def.args:
+        return 1
+    limits = [get_argument(field, name, variables) for name in ('first', 'last')]
+    limits = [limit for limit in limits if limit is not None]
+    if not limits:
+        return default_limit
+    return max(1, min(limits))
+
+
+class CostAnalysis(object):
+    def __init__(self, schema, document_ast, variables=None, weights=None,
+                 default_limit=100):
+        self.schema = schema
+        self.variables = variables
+        self.weights = weights or {}
+        self.default_limit = default_limit
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document_ast.definitions
+            if isinstance(definition, ast.FragmentDefinition)
+        }
+        self.operations = [
+            definition for definition in document_ast.definitions
+            if isinstance(definition, ast.OperationDefinition)
+        ]
+
+    def get_operation(self, operation_name=None):
+        for operation in self.operations:
+            if operation_name is None or (
+                    operation.name and operation.name.value == operation_name):
+                return operation
+        return None
+
+    def get_root_type(self, operation):
+        if operation.operation == 'mutation':
+            return self.schema.get_mutation_type()
+        if operation.operation == 'subscription':
+            return self.schema.get_subscription_type()
+        return self.schema.get_query_type()
+
+    def selection_set_cost(self, parent_type, selection_set, visited=()):
+        fields = getattr(parent_type, 'fields', None) or {}
+        cost = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                cost += self.field_cost(parent_type, fields, selection, visited)
+            elif isinstance(selection, ast.InlineFragment):
+                cost += self.selection_set_cost(
+                    self.get_condition_type(selection, parent_type),
+                    selection.selection_set, visited)
+            elif isinstance(selection, ast.FragmentSpread):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is None or name in visited:
+                    continue
+                cost += self.selection_set_cost(
+                    self.get_condition_type(fragment, parent_type),
+                    fragment.selection_set, visited + (name, ))
+        return cost
+
+    def get_condition_type(self, fragment, parent_type):
+        if fragment.type_condition is None:
+            return parent_type
+        return self.schema.get_type(fragment.type_condition.name.value)
+
+    def field_cost(self, parent_type, fields, field, visited):
+        name = field.name.value
+        field_def = fields.get(name)
+        if field_def is None:
+            # introspection fields
+            return 0
+
+        weight = self.weights.get('%s.%s' % (parent_type.name, name))
+        if field.selection_set is None:
+            return weight or 0
+
+        if weight is None:
+            weight = 1
+        children = self.selection_set_cost(
+            get_named_type(field_def.type), field.selection_set, visited)
+        multiplier = get_multiplier(field_def, field, self.variables,
+                                    self.default_limit)
+        return weight + multiplier * children
+
+    def get_cost(self, operation_name=None):
+        operation = self.get_operation(operation_name)
+        if operation is None:
+            return 0
+        self.variables = get_variables(operation, self.variables)
+        return self.selection_set_cost(self.get_root_type(operation),
+                                       operation.selection_set)
+
+
+def get_cost(schema, document_ast, variables=None, operation_name=None,
+             weights=None, default_limit=100):
+    return CostAnalysis(schema, document_ast, variables, weights,
+                        default_limit).get_cost(operation_name)
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from functools import partial
+
+from graphql import GraphQLError, parse, validate
+from graphql.backend.core import GraphQLCoreBackend
+from graphql.backend.base import GraphQLDocument
+from graphql.execution import ExecutionResult, execute
+
+from .cost import get_cost
+
+logger = logging.getLogger(__name__)
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+def execute_validated(schema, document_ast, errors, *args, **kwargs):
+    if errors:
+        return ExecutionResult(errors=errors, invalid=True)
+    return execute(schema, document_ast, *args, **kwargs)
+
+
+class CostLimit(object):
+    """
+    Rejects operations whose static cost (see `backend.cost`) is above
+    `max_cost`, the cost is reported in the result extensions. With
+    `report_only` they are logged and executed anyway, to calibrate the
+    budget against the clients' queries.
+    """
+    def __init__(self, max_cost=None, weights=None, default_limit=100,
+                 report_only=False):
+        self.max_cost = max_cost
+        self.weights = weights
+        self.default_limit = default_limit
+        self.report_only = report_only
+
+    def execute(self, schema, document_ast, errors, *args, **kwargs):
+        if errors:
+            return ExecutionResult(errors=errors, invalid=True)
+
+        cost = get_cost(schema, document_ast, kwargs.get('variables'),
+                        kwargs.get('operation_name'), self.weights,
+                        self.default_limit)
+        if self.max_cost is not None and cost > self.max_cost:
+            if self.report_only:
+                logger.warning('Query cost %d exceeds the maximum of %d: %s',
+                               cost, self.max_cost, kwargs.get(
+                                   'operation_name') or 'anonymous')
+            else:
+                return ExecutionResult(errors=[GraphQLError(
+                    'Query cost %d exceeds the maximum of %d.' % (
+                        cost, self.max_cost))],
+                    invalid=True, extensions={'cost': cost})
+
+        result = execute(schema, document_ast, *args, **kwargs)
+        result.extensions = dict(result.extensions or {}, cost=cost)
+        return result
+
+
+class CachedDocumentBackend(GraphQLCoreBackend):
+    """
+    Keeps an LRU of parsed and validated documents keyed by the sha256 of
+    the query, so repeated operations skip parsing and validation.
+    """
+    def __init__(self, max_size=500, cost_limit=None, executor=None):
+        super(CachedDocumentBackend, self).__init__(executor=executor)
+        self.max_size = max_size
+        self.execute_document = cost_limit.execute if cost_limit \
+            else execute_validated
+        self.documents = OrderedDict()
+        self.pinned = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def build_document(self, schema, document_string):
+        document_ast = parse(document_string)
+        errors = validate(schema, document_ast)
+        return self.make_document(schema, document_string, document_ast,
+                                  errors)
+
+    def make_document(self, schema, document_string, document_ast, errors):
+        return GraphQLDocument(
+            schema=schema,
+            document_string=document_string,
+            document_ast=document_ast,
+            execute=partial(self.execute_document, schema, document_ast,
+                            errors, **self.execute_params),
+        )
+
+    def document_from_string(self, schema, document_string):
+        key = (id(schema), query_hash(document_string))
+        document = self.pinned.get(key)
+        if document is not None:
+            self.hits += 1
+            return document
+
+        with self.lock:
+            document = self.documents.get(key)
+            if document is not None:
+                self.documents.move_to_end(key)
+                self.hits += 1
+                return document
+            self.misses += 1
+
+        # parse errors are raised and never cached
+        document = self.build_document(schema, document_string)
+
+        with self.lock:
+            self.documents[key] = document
+            while len(self.documents) > self.max_size:
+                self.documents.popitem(last=False)
+        return document
+
+    def pin(self, schema, document_string):
+        """
+        Parses and validates a document that is never evicted, returns the
+        validation errors.
+        """
+        document_ast = parse(document_string)
+        errors = validate(schema, document_ast)
+        key = (id(schema), query_hash(document_string))
+        self.pinned[key] = self.make_document(schema, document_string,
+                                              document_ast, errors)
+        return errors
+
+    def stats(self):
+        return {
+            'size': len(self.documents),
+            'pinned': len(self.pinned),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+class RequestDocuments(object):
+    """
+    The backend as seen by one request: each query is looked up once and
+    the document (or the parse error) reused by the operation type check
+    and the execution.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self.documents = {}
+
+    def document_from_string(self, schema, document_string):
+        key = (id(schema), document_string)
+        if key not in self.documents:
+            try:
+                self.documents[key] = (self.backend.document_from_string(
+                    schema, document_string), None)
+            except Exception as e:
+                self.documents[key] = (None, e)
+        document, error = self.documents[key]
+        if error is not None:
+            raise error
+        return document
+
+
+class PersistedQueries(object):
+    """
+    Registry of the operations in the frontend's query manifest, a JSON
+    object mapping each operation id to its query text. Documents are
+    parsed and validated once, when the manifest is loaded, and invalid
+    ones raise there.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.queries = {}
+
+    def load(self, schema, backend):
+        queries = {}
+        if self.path:
+            with open(self.path) as f:
+                queries = json.load(f)
+        for operation_id, query in queries.items():
+            errors = backend.pin(schema, query)
+            if errors:
+                raise ValueError('Persisted query %s is invalid: %s' % (
+                    operation_id, errors[0]))
+        self.queries = queries
+
+    def get(self, operation_id):
+        return self.queries.get(operation_id)
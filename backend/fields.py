@@ -1,7 +1,14 @@
 import graphene
+from graphene.relay import Node
+from graphql_relay import from_global_id
+from promise import Promise
 
+from django.core.exceptions import ObjectDoesNotExist
 from django.utils.translation import ugettext_lazy as _
 
+from db.loaders import get_loaders
+from db.models import DocumentBase, DocumentID, Revision
+
 
 def Viewer():
     from backend.schema_queries import Query, get_default_viewer
@@ -34,3 +41,60 @@ class GetBy(graphene.Field):
 
     def get_resolver(self, parent_resolver):
         return self.model_resolver
+
+
+def load_node(info, global_id):
+    """
+    Node of `global_id` through the request loaders, so nodes of the same
+    type are loaded together, or None when it does not exist.
+    """
+    if global_id == 'viewer':
+        from backend.schema_queries import get_default_viewer
+        return get_default_viewer()
+
+    try:
+        type_name, id = from_global_id(global_id)
+    except Exception:
+        return None
+    graphene_type = getattr(info.schema.get_type(type_name),
+                            'graphene_type', None)
+    if graphene_type is None or \
+            Node not in getattr(graphene_type._meta, 'interfaces', ()):
+        return None
+
+    loaders = get_loaders(info.context)
+    model = getattr(graphene_type._meta, 'model', None)
+    try:
+        if model is Revision:
+            return loaders.revisions.load(int(id))
+        if model is DocumentID:
+            return loaders.documents.load(int(id))
+        if model is not None and issubclass(model, DocumentBase):
+            if ':' in id:
+                # "<document_id>:<revision_id>" ids of past revisions
+                document_id, revision_id = id.split(':', 1)
+                return loaders.objects(model).load(int(revision_id))
+            return loaders.tip(model, int(id))
+        return graphene_type.get_node(info, id)
+    except (ValueError, ObjectDoesNotExist):
+        return None
+
+
+class Nodes(graphene.Field):
+    """
+    Nodes of a list of global ids, in the same order, with nulls for the
+    ones that don't exist.
+    """
+    def __init__(self, node, **kwargs):
+        super(Nodes, self).__init__(
+            graphene.List(node),
+            ids=graphene.List(graphene.NonNull(graphene.ID), required=True),
+            **kwargs)
+
+    def nodes_resolver(self, instance, info, ids):
+        return Promise.all([
+            Promise.resolve(load_node(info, global_id)) for global_id in ids
+        ])
+
+    def get_resolver(self, parent_resolver):
+        return self.nodes_resolver
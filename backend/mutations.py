@@ -4,6 +4,8 @@ from graphene import relay
 from graphene.types import InputField, String, AbstractType
 from graphene.utils.props import props
 
+from db.loaders import clear_loaders
+
 from .fields import Errors, Viewer
 
 
@@ -26,4 +28,7 @@ class Mutation(AbstractType, relay.ClientIDMutation):
     @classmethod
     def mutate(cls, root, info, input):
         info.context.revisionMessage = input.get('revision_message') or input.get('revisionMessage')
-        return super().mutate(root, info, input)
+        result = super().mutate(root, info, input)
+        # objects loaded before the write are stale for the payload
+        clear_loaders(info.context)
+        return result
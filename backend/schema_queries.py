@@ -2,11 +2,10 @@ import os
 import graphene
 from graphene import relay
 from graphene.relay.node import NodeField as RelayNodeField
-from graphene_django.filter import DjangoFilterConnectionField
 from graphene_django.debug import DjangoDebug
 from decimal import Decimal
 
-from django.db import connection
+from django.db import connections
 from django.db.models import Q
 from django.contrib.gis.geos import Polygon
 
@@ -21,11 +20,23 @@ from life.models_graphql import (
 )
 from occurrences.models_graphql import Occurrence, OccurrenceFilter, SuggestionID, OccurrenceCluster
 from db.models_graphql import Revision, Document
+from db.counting import CACHED, ESTIMATED
+from db.graphene import DjangoFilterConnectionField
+from db.routers import aggregate_db
 from lists.models_graphql import List
 from images.models_graphql import Image
 from shortenr.models_graphql import Query as ShortnerQuery
 
-from .fields import GetBy
+from .fields import GetBy, Nodes
+
+
+def get_documents(model, args):
+    """
+    Tips of `model`, or the state of its documents at the `as_of` argument.
+    """
+    if args.get('as_of'):
+        return model.objects.as_of(args['as_of'])
+    return model.objects.all()
 
 
 def get_default_viewer(*args, **kwargs):
@@ -52,15 +63,21 @@ class Query(UserQuery, ShortnerQuery, graphene.ObjectType):
     revision = relay.Node.Field(Revision)
     document = relay.Node.Field(Document)
 
-    all_posts = DjangoFilterConnectionField(Post, on='objects')
+    all_posts = DjangoFilterConnectionField(Post, on='objects', args={
+        'as_of': graphene.Argument(graphene.DateTime, required=False),
+    }, count_strategy=CACHED)
     post = relay.Node.Field(Post)
     post_by_url = GetBy(Post, url=graphene.String(required=True))
 
-    all_pages = DjangoFilterConnectionField(Page, on='objects')
+    all_pages = DjangoFilterConnectionField(Page, on='objects', args={
+        'as_of': graphene.Argument(graphene.DateTime, required=False),
+    })
     page = relay.Node.Field(Page)
     page_by_url = GetBy(Page, url=graphene.String(required=True))
 
-    all_tags = DjangoFilterConnectionField(Tag)
+    all_tags = DjangoFilterConnectionField(Tag, args={
+        'as_of': graphene.Argument(graphene.DateTime, required=False),
+    })
     tag = relay.Node.Field(Tag)
     tag_by_slug = GetBy(Tag, slug=graphene.String(required=True))
 
@@ -77,15 +94,21 @@ class Query(UserQuery, ShortnerQuery, graphene.ObjectType):
     allLifeNode = DjangoFilterConnectionField(LifeNode, args={
         'search': graphene.Argument(graphene.String, required=False),
         'order_by': graphene.Argument(graphene.String, required=False),
-        'edibles': graphene.Argument(graphene.Boolean, required=False)
-    }, total_found2=graphene.Int(required=False, name='totalFound2'))
+        'edibles': graphene.Argument(graphene.Boolean, required=False),
+        'as_of': graphene.Argument(graphene.DateTime, required=False),
+    }, total_found2=graphene.Int(required=False, name='totalFound2'),
+        count_strategy=ESTIMATED)
 
     occurrence = relay.Node.Field(Occurrence)
-    allOccurrences = DjangoFilterConnectionField(Occurrence, filterset_class=OccurrenceFilter)
+    allOccurrences = DjangoFilterConnectionField(Occurrence, filterset_class=OccurrenceFilter, args={
+        'as_of': graphene.Argument(graphene.DateTime, required=False),
+    }, count_strategy=ESTIMATED)
     allOccurrencesCluster = graphene.List(OccurrenceCluster, args={
         'within_bbox': graphene.Argument(graphene.String, required=True),
     })
-    allWhatIsThis = DjangoFilterConnectionField(Occurrence, filterset_class=OccurrenceFilter)
+    allWhatIsThis = DjangoFilterConnectionField(Occurrence, filterset_class=OccurrenceFilter, args={
+        'as_of': graphene.Argument(graphene.DateTime, required=False),
+    }, count_strategy=CACHED)
     suggestionID = relay.Node.Field(SuggestionID)
 
     list = relay.Node.Field(List)
@@ -93,6 +116,7 @@ class Query(UserQuery, ShortnerQuery, graphene.ObjectType):
     lifeNodeQuizz = graphene.Field(Quizz, resolver=generate_quiz)
 
     node = NodeField(relay.Node)
+    nodes = Nodes(relay.Node)
 
     version = graphene.String()
 
@@ -104,8 +128,17 @@ class Query(UserQuery, ShortnerQuery, graphene.ObjectType):
     def resolve_viewer(self, *args, **kwargs):
         return get_default_viewer(*args, **kwargs)
 
+    def resolve_all_posts(self, info, **kwargs):
+        return get_documents(Post._meta.model, kwargs)
+
+    def resolve_all_pages(self, info, **kwargs):
+        return get_documents(Page._meta.model, kwargs)
+
+    def resolve_all_tags(self, info, **kwargs):
+        return get_documents(Tag._meta.model, kwargs)
+
     def resolve_allOccurrences(self, info, **kwargs):
-        qs = Occurrence._meta.model.objects.all()
+        qs = get_documents(Occurrence._meta.model, kwargs)
         return qs.order_by('-document__created_at').filter(
             location__isnull=False,
             identity__isnull=False,
@@ -119,7 +152,7 @@ class Query(UserQuery, ShortnerQuery, graphene.ObjectType):
         bbox = [Decimal(v) for v in within_bbox.split(',')]
         geom = Polygon.from_bbox(bbox)
 
-        with connection.cursor() as cursor:
+        with connections[aggregate_db()].cursor() as cursor:
             cursor.execute('''
 				WITH clusters AS (
 					SELECT unnest(ST_ClusterWithin("occurrences_occurrence"."location"::geometry, 0.0035)) AS cluster
@@ -143,11 +176,11 @@ class Query(UserQuery, ShortnerQuery, graphene.ObjectType):
         return items
 
     def resolve_allWhatIsThis(self, info, **kwargs):
-        qs = Occurrence._meta.model.objects.all()
+        qs = get_documents(Occurrence._meta.model, kwargs)
         return qs.order_by('-document__created_at').filter(is_request=True)
 
     def resolve_allLifeNode(self, info, **args):
-        qs = LifeNode._meta.model.objects.all()
+        qs = get_documents(LifeNode._meta.model, args)
         if 'edibles' in args and bool(args['edibles']):
             qs = qs.filter(edibility__gte=1)
         if 'search' in args and len(args['search']) > 2:
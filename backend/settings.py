@@ -104,10 +104,28 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASS'),
         'HOST': os.getenv('DB_SERVICE'),
         'PORT': os.getenv('DB_PORT'),
+        # except for GraphQL, where queries run in autocommit and mutations
+        # get their own transaction (see backend.views.GraphQLView)
         'ATOMIC_REQUESTS': True,
     }
 }
 
+# read replica, e.g. a streaming replica or, locally, a copy of the
+# database; GraphQL queries read from it, see db.routers
+if os.getenv('DB_REPLICA_NAME') or os.getenv('DB_REPLICA_SERVICE'):
+    DATABASES['replica'] = dict(
+        DATABASES['default'],
+        NAME=os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        HOST=os.getenv('DB_REPLICA_SERVICE', DATABASES['default']['HOST']),
+        PORT=os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        TEST={'MIRROR': 'default'},
+    )
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['db.routers.ReplicaRouter']
+# seconds a session reads from the primary after a mutation
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.9/ref/settings/#auth-password-validators
@@ -227,10 +245,72 @@ GRAPHENE = {
     'SCHEMA': 'backend.schema.schema',
     'MIDDLEWARE': [
         'graphene_django.debug.DjangoDebugMiddleware',
+        'db.response_cache.ResponseCacheMiddleware',
     ],
     'RELAY_CONNECTION_MAX_LIMIT': 10000,
 }
 
+# number of parsed and validated queries kept by backend.documents
+GRAPHQL_DOCUMENT_CACHE_SIZE = int(os.getenv('GRAPHQL_DOCUMENT_CACHE_SIZE', 500))
+
+# JSON manifest of {"<id>": "<query>"} from the frontend, requests can then
+# send {"id": "<id>", "variables": ...} instead of the query text
+GRAPHQL_PERSISTED_QUERIES = os.getenv('GRAPHQL_PERSISTED_QUERIES')
+GRAPHQL_PERSISTED_QUERIES_ONLY = os.getenv('GRAPHQL_PERSISTED_QUERIES_ONLY') == 'true'
+
+# operations with a static cost above this are rejected, see backend.cost
+GRAPHQL_MAX_COST = int(os.getenv('GRAPHQL_MAX_COST', 50000))
+# {"Type.field": weight} overriding the default of 1 per object field
+GRAPHQL_COST_WEIGHTS = {}
+# expected page size of connections queried without first/last
+GRAPHQL_COST_DEFAULT_LIMIT = int(os.getenv('GRAPHQL_COST_DEFAULT_LIMIT', 20))
+# log operations above GRAPHQL_MAX_COST instead of rejecting them
+GRAPHQL_COST_REPORT_ONLY = os.getenv('GRAPHQL_COST_REPORT_ONLY') == 'true'
+# maximum number of operations in a batch (a JSON array) request
+GRAPHQL_BATCH_MAX_SIZE = int(os.getenv('GRAPHQL_BATCH_MAX_SIZE', 20))
+
+# revisions younger than this are held back from the revision feed, it
+# must be longer than the slowest write transaction, see db.feed
+REVISION_FEED_LAG = int(os.getenv('REVISION_FEED_LAG', 60))
+
+# seconds revision diffs are cached, see db.diff
+DIFF_CACHE_TIMEOUT = int(os.getenv('DIFF_CACHE_TIMEOUT', 86400))
+
+# totalCount strategies of connections, see db.counting
+COUNT_ESTIMATE_THRESHOLD = int(os.getenv('COUNT_ESTIMATE_THRESHOLD', 10000))
+COUNT_CACHE_TIMEOUT = int(os.getenv('COUNT_CACHE_TIMEOUT', 600))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # e.g. django.core.cache.backends.filebased.FileBasedCache or
+    # django.core.cache.backends.memcached.MemcachedCache to share it
+    'graphql': {
+        'BACKEND': os.getenv('GRAPHQL_RESPONSE_CACHE_BACKEND',
+                             'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('GRAPHQL_RESPONSE_CACHE_LOCATION', 'graphql'),
+    },
+}
+
+# document rows by revision, see db.object_cache: entries kept per process
+# and the cache alias shared between processes
+OBJECT_CACHE_SIZE = int(os.getenv('OBJECT_CACHE_SIZE', 1000))
+OBJECT_CACHE = os.getenv('OBJECT_CACHE', 'default')
+# seconds entries are kept without INVALIDATION_BUS, as the other processes
+# are not told about changes then
+OBJECT_CACHE_TIMEOUT = int(os.getenv('OBJECT_CACHE_TIMEOUT', 60))
+
+# cache alias of anonymous GraphQL responses, disabled when empty, see
+# db.response_cache
+GRAPHQL_RESPONSE_CACHE = os.getenv('GRAPHQL_RESPONSE_CACHE')
+GRAPHQL_RESPONSE_CACHE_TIMEOUT = int(
+    os.getenv('GRAPHQL_RESPONSE_CACHE_TIMEOUT', 300))
+
+# relay document changes to the other processes with Postgres
+# LISTEN/NOTIFY so their in-process caches are evicted, see db.invalidation
+INVALIDATION_BUS = os.getenv('INVALIDATION_BUS') == 'true'
+
 # Testing
 EMAIL_BACKEND="djmail.backends.default.EmailBackend"
 DJMAIL_REAL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.locmem.EmailBackend')
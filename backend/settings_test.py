@@ -3,3 +3,7 @@ from .settings import *
 INSTALLED_APPS += [
     'tests'
 ]
+
+# reads of the replica tests go to the test database, see db.routers
+DATABASES.setdefault('replica', dict(DATABASES['default'],
+                                     TEST={'MIRROR': 'default'}))
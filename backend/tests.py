@@ -1,8 +1,29 @@
 import json
+import os
+import tempfile
+from unittest import mock
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.db import connection, connections, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve
+from graphql import parse
 
 from accounts.models import User
+from backend.cost import get_cost
+from backend.documents import (
+    CachedDocumentBackend, CostLimit, PersistedQueries, query_hash
+)
+from backend.schema import schema
+from backend.urls import graphql_backend
+from backend.views import GraphQLView
+from db import object_cache
+from db.response_cache import ResponseCache, document_tag
+from db.signals import documents_changed
+from life.tests.factories import LifeNodeFactory
 
 
 class GraphQLTest(TestCase):
@@ -23,6 +44,33 @@ class GraphQLTest(TestCase):
                            content_type=content_type,
                            data=data)
 
+    def capture_list_queries(self, field, node_fields, first):
+        """
+        Queries run to list the first `first` nodes of the connection
+        `field` with `node_fields`, for checks that they don't grow with
+        the page size.
+        """
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.graphql({
+                'query': '''
+                    query Q($first: Int!) {
+                        %s(first: $first) {
+                            edges {
+                                node {
+                                    %s
+                                }
+                            }
+                        }
+                    }
+                    ''' % (field, node_fields),
+                'variables': {
+                    'first': first,
+                },
+            })
+        edges = response.json()['data'][field]['edges']
+        self.assertEqual(len(edges), first)
+        return ctx.captured_queries
+
 
 class UserTestCase(GraphQLTest):
     def setUp(self):
@@ -94,3 +142,296 @@ class UserTestCase(GraphQLTest):
 
     def _do_login_admin(self, username='admin', password='admin'):
         return self._do_login(username, password)
+
+
+class DocumentCacheTest(GraphQLTest):
+    def test_document_cache(self):
+        query = {'query': 'query { version }'}
+
+        self.graphql(query)
+        stats = graphql_backend.stats()
+        response = self.graphql(query)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(graphql_backend.stats()['hits'], stats['hits'] + 1)
+        self.assertEqual(graphql_backend.stats()['misses'], stats['misses'])
+
+        response = self.graphql({'query': 'query { doesNotExist }'})
+        self.assertEqual(response.status_code, 400)
+        response = self.graphql({'query': 'query { doesNotExist }'})
+        self.assertEqual(response.status_code, 400)
+
+        # syntax errors aren't cached, but are only parsed once per request
+        stats = graphql_backend.stats()
+        response = self.graphql({'query': 'query {'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(graphql_backend.stats()['misses'],
+                         stats['misses'] + 1)
+
+
+class PersistedQueriesTest(TestCase):
+    def setUp(self):
+        self.query = 'query { version }'
+        self.id = query_hash(self.query)
+
+        self.backend = CachedDocumentBackend()
+        persisted = PersistedQueries(self.write_manifest({
+            self.id: self.query}))
+        persisted.load(schema, self.backend)
+        self.view = GraphQLView.as_view(
+            schema=schema, backend=self.backend,
+            persisted_queries=persisted)
+
+    def write_manifest(self, queries):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as manifest:
+            json.dump(queries, manifest)
+        return path
+
+    def post(self, data):
+        request = RequestFactory().post('/graphql', json.dumps(data),
+                                        content_type='application/json')
+        return self.view(request)
+
+    def test_persisted_query(self):
+        response = self.post({'id': self.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('version', json.loads(response.content)['data'])
+        self.assertEqual(self.backend.stats()['pinned'], 1)
+        self.assertEqual(self.backend.stats()['misses'], 0)
+
+    def test_unknown_id(self):
+        response = self.post({'id': 'unknown'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_persisted_only(self):
+        with self.settings(GRAPHQL_PERSISTED_QUERIES_ONLY=True):
+            response = self.post({'query': self.query})
+            self.assertEqual(response.status_code, 400)
+            response = self.post({'id': self.id})
+            self.assertEqual(response.status_code, 200)
+
+    def test_invalid_manifest(self):
+        persisted = PersistedQueries(self.write_manifest({
+            'invalid': 'query { doesNotExist }'}))
+        with self.assertRaises(ValueError):
+            persisted.load(schema, CachedDocumentBackend())
+
+
+class QueryCostTest(GraphQLTest):
+    def test_cost(self):
+        document = parse('''
+            query Q($first: Int) {
+                allLifeNode(first: $first) {
+                    edges { node { id title children(first: 5) {
+                        edges { node { id } }
+                    } } }
+                }
+            }
+        ''')
+        # allLifeNode + first * (edges + node + children + 5 * (edges + node))
+        self.assertEqual(get_cost(schema, document, {'first': 10}),
+                         1 + 10 * (1 + 1 + 1 + 5 * 2))
+        self.assertEqual(get_cost(schema, document, {'first': 10},
+                                  weights={'LifeNode.title': 2}),
+                         1 + 10 * (1 + 1 + 2 + 1 + 5 * 2))
+        self.assertEqual(get_cost(schema, document, default_limit=100),
+                         1 + 100 * (1 + 1 + 1 + 5 * 2))
+
+    def test_variable_default(self):
+        document = parse('''
+            query Q($first: Int = 5) {
+                allLifeNode(first: $first) { edges { node { id } } }
+            }
+        ''')
+        self.assertEqual(get_cost(schema, document, default_limit=100),
+                         1 + 5 * 2)
+        self.assertEqual(get_cost(schema, document, {'first': 10}),
+                         1 + 10 * 2)
+
+    def test_cost_limit(self):
+        response = self.graphql({'query': '''
+            query {
+                allLifeNode(first: 10000) {
+                    edges { node { children(first: 10000) {
+                        edges { node { id } }
+                    } } }
+                }
+            }
+        '''})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cost', response.json()['errors'][0]['message'])
+
+        response = self.graphql({'query': '''
+            query { allLifeNode(first: 2) { edges { node { id } } } }
+        '''})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['extensions'], {'cost': 1 + 2 * 2})
+
+        # nested connections without first count as a default page
+        response = self.graphql({'query': '''
+            query {
+                allOccurrences(first: 30) { edges { node {
+                    images { edges { node { id } } }
+                } } }
+            }
+        '''})
+        self.assertEqual(response.status_code, 200)
+
+    def test_report_only(self):
+        document = parse(
+            'query { allLifeNode(first: 2) { edges { node { id } } } }')
+        cost_limit = CostLimit(max_cost=1, report_only=True)
+        result = cost_limit.execute(schema, document, [])
+        self.assertFalse(result.invalid)
+        self.assertEqual(result.extensions, {'cost': 1 + 2 * 2})
+
+
+class BatchTest(GraphQLTest):
+    def test_batch(self):
+        response = self.graphql([
+            {'id': 'a', 'query': 'query { version }'},
+            {'id': 'b', 'query': 'query { doesNotExist }'},
+            {'id': 'c'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        a, b, c = response.json()
+        self.assertEqual((a['id'], a['status']), ('a', 200))
+        self.assertIn('version', a['data'])
+        self.assertEqual((b['id'], b['status']), ('b', 400))
+        self.assertIn('errors', b)
+        self.assertEqual((c['id'], c['status']), ('c', 400))
+
+    def test_batch_limits(self):
+        response = self.graphql([])
+        self.assertEqual(response.status_code, 400)
+        with self.settings(GRAPHQL_BATCH_MAX_SIZE=1):
+            response = self.graphql([{'query': 'query { version }'}] * 2)
+            self.assertEqual(response.status_code, 400)
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        caches['graphql'].clear()
+        self.view = GraphQLView.as_view(
+            schema=schema, backend=CachedDocumentBackend(),
+            response_cache=ResponseCache('graphql'))
+        self.node = LifeNodeFactory(title='Before')
+
+    def post(self, user=None, document_id=None):
+        request = RequestFactory().post('/graphql', json.dumps({
+            'query': '''
+                query Q($id: Int!) {
+                    lifeNodeByIntID(documentId: $id) { title }
+                }
+            ''',
+            'variables': {'id': document_id or self.node.document_id},
+        }), content_type='application/json')
+        request.user = user or AnonymousUser()
+        response = self.view(request)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)['data']['lifeNodeByIntID']
+
+    def test_response_cache(self):
+        self.assertEqual(self.post(), {'title': 'Before'})
+        type(self.node).objects.filter(pk=self.node.pk).update(title='After')
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.post(), {'title': 'Before'})
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        # authenticated requests are never cached
+        user = User(username='cache', email='cache@queplanta.com')
+        user.save(request=None)
+        self.assertEqual(self.post(user), {'title': 'After'})
+
+        with self.settings(GRAPHQL_RESPONSE_CACHE='graphql'):
+            documents_changed.send(sender=type(self.node),
+                                   tips={self.node.document_id: None})
+        self.assertEqual(self.post(), {'title': 'After'})
+
+    def test_not_found(self):
+        missing_id = self.node.document_id + 1000
+        self.assertIsNone(self.post(document_id=missing_id))
+
+        # nulls depend on the model, a new document of it invalidates them
+        with self.settings(GRAPHQL_RESPONSE_CACHE='graphql'):
+            documents_changed.send(sender=type(self.node), tips={})
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertIsNone(self.post(document_id=missing_id))
+        self.assertGreater(len(ctx.captured_queries), 0)
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE='graphql')
+class ResponseCacheM2MTest(TransactionTestCase):
+    def test_m2m_changed(self):
+        node = LifeNodeFactory()
+        other = LifeNodeFactory()
+        response_cache = ResponseCache('graphql')
+        response_cache.set('node', {'data': {}},
+                           [document_tag(node.document_id)])
+        response_cache.set('other', {'data': {}},
+                           [document_tag(other.document_id)])
+
+        # no new revision, the responses of both sides are dropped
+        node.commonNames.add(other.document)
+        self.assertIsNone(response_cache.get('node'))
+        self.assertIsNone(response_cache.get('other'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaResponseCacheTest(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        caches['graphql'].clear()
+        self.node = LifeNodeFactory(title='Node')
+        object_cache.local.clear()
+        caches[settings.OBJECT_CACHE].clear()
+
+    def post(self, view):
+        request = RequestFactory().post('/graphql', json.dumps({
+            'query': '''
+                query Q($id: Int!) {
+                    lifeNodeByIntID(documentId: $id) { title }
+                }
+            ''',
+            'variables': {'id': self.node.document_id},
+        }), content_type='application/json')
+        request.user = AnonymousUser()
+        request.session = {}
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['data'],
+                         {'lifeNodeByIntID': {'title': 'Node'}})
+        return len(replica.captured_queries)
+
+    def test_fill_from_primary(self):
+        view = GraphQLView.as_view(schema=schema)
+        self.assertGreater(self.post(view), 0)
+
+        # responses going to the cache are not read from the replica
+        view = GraphQLView.as_view(schema=schema,
+                                   response_cache=ResponseCache('graphql'))
+        self.assertEqual(self.post(view), 0)
+
+
+class TransactionTest(UserTestCase):
+    def test_mutations_are_atomic(self):
+        with mock.patch.object(GraphQLView, 'mutation_atomic',
+                               side_effect=transaction.atomic) as atomic:
+            response = self.graphql({'query': 'query { version }'})
+            self.assertEqual(response.status_code, 200)
+            atomic.assert_not_called()
+
+            self._do_login()
+            atomic.assert_called_once_with()
+
+    def test_non_atomic_requests(self):
+        # other views keep ATOMIC_REQUESTS
+        self.assertEqual(resolve('/graphql').func._non_atomic_requests,
+                         set(settings.DATABASES))
+        self.assertFalse(hasattr(resolve('/admin/').func,
+                                 '_non_atomic_requests'))
@@ -4,21 +4,35 @@ from django.contrib import admin
 from django.views.decorators.csrf import csrf_exempt
 from django.views.static import serve as static_serve
 
-from graphene_django.views import GraphQLView
+from db.response_cache import get_response_cache
+from db.views import revision_feed
+from .documents import CachedDocumentBackend, CostLimit
 from .schema import schema
+from .views import GraphQLView, persisted_queries
 
 
 def dumb_view(request, *args, **kwargs):
     return None
 
+graphql_backend = CachedDocumentBackend(
+    max_size=settings.GRAPHQL_DOCUMENT_CACHE_SIZE,
+    cost_limit=CostLimit(
+        max_cost=settings.GRAPHQL_MAX_COST,
+        weights=settings.GRAPHQL_COST_WEIGHTS,
+        default_limit=settings.GRAPHQL_COST_DEFAULT_LIMIT,
+        report_only=settings.GRAPHQL_COST_REPORT_ONLY))
+
 URL_PASSWORD_RESET = r'conta/resetar-senha/(?P<uidb64>[0-9A-Za-z_\-]+)/(?P<token>[0-9A-Za-z]{1,13}-[0-9A-Za-z]{1,20})/'
 
 
 urlpatterns = [
     url(r'^s/', include('shortener.urls')),
     url(r'^admin/', admin.site.urls),
-    url(r'^graphql', csrf_exempt(GraphQLView.as_view(schema=schema,
-                                                     graphiql=True))),
+    url(r'^graphql', csrf_exempt(GraphQLView.as_view(
+        schema=schema, graphiql=True, backend=graphql_backend,
+        persisted_queries=persisted_queries(schema, graphql_backend),
+        response_cache=get_response_cache()))),
+    url(r'^revisions/feed$', revision_feed, name='revision_feed'),
 
     url(r'^%s$' % URL_PASSWORD_RESET,
         dumb_view, name='password_reset_confirm'),
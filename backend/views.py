@@ -0,0 +1,212 @@
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponseBadRequest
+
+from graphene_django.views import GraphQLView as BaseGraphQLView, HttpError
+
+from db.response_cache import response_key
+from db.routers import is_pinned, pin_primary, use_replica
+
+from .documents import PersistedQueries, RequestDocuments, query_hash
+
+
+class GraphQLView(BaseGraphQLView):
+    """
+    A JSON array of operations is executed as a batch: the operations share
+    the request (so its user and loaders), each result carries its own
+    "status" and errors of one operation don't fail the others.
+
+    Queries run in autocommit on a replica, unless their response is going
+    to be cached, each mutation operation in a transaction on the primary
+    (see `db.routers`).
+    """
+    persisted_queries = None
+    response_cache = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # the view manages its own transactions, see mutation_atomic()
+        view = super(GraphQLView, cls).as_view(**initkwargs)
+        for alias in settings.DATABASES:
+            view = transaction.non_atomic_requests(using=alias)(view)
+        return view
+
+    def mutation_atomic(self):
+        return transaction.atomic()
+
+    def parse_body(self, request):
+        if self.get_content_type(request) != 'application/json':
+            return super(GraphQLView, self).parse_body(request)
+
+        try:
+            data = json.loads(request.body.decode('utf-8'))
+        except (UnicodeDecodeError, ValueError):
+            raise HttpError(HttpResponseBadRequest(
+                'POST body sent invalid JSON.'))
+
+        if isinstance(data, list):
+            if not data:
+                raise HttpError(HttpResponseBadRequest(
+                    'Received an empty list in the batch request.'))
+            if len(data) > settings.GRAPHQL_BATCH_MAX_SIZE:
+                raise HttpError(HttpResponseBadRequest(
+                    'Batch requests are limited to %d operations.' %
+                    settings.GRAPHQL_BATCH_MAX_SIZE))
+            if not all(isinstance(entry, dict) for entry in data):
+                raise HttpError(HttpResponseBadRequest(
+                    'The received data is not a valid JSON query.'))
+            self.batch = True
+        elif not isinstance(data, dict):
+            raise HttpError(HttpResponseBadRequest(
+                'The received data is not a valid JSON query.'))
+        return data
+
+    def get_graphql_params(self, request, data):
+        query, variables, operation_name, operation_id = \
+            super(GraphQLView, self).get_graphql_params(request, data)
+
+        if self.persisted_queries is None:
+            return query, variables, operation_name, operation_id
+
+        if operation_id and not query:
+            query = self.persisted_queries.get(operation_id)
+            if not query:
+                raise HttpError(HttpResponseBadRequest(
+                    'PersistedQueryNotFound'))
+        elif query and settings.GRAPHQL_PERSISTED_QUERIES_ONLY:
+            raise HttpError(HttpResponseBadRequest(
+                'Only persisted queries are allowed.'))
+
+        return query, variables, operation_name, operation_id
+
+    def get_response(self, request, data, show_graphiql=False):
+        try:
+            return self.get_operation_response(request, data, show_graphiql)
+        except HttpError as e:
+            if not self.batch:
+                raise
+            response = {
+                'errors': [self.format_error(e)],
+                'id': data.get('id'),
+                'status': e.response.status_code,
+            }
+            return self.json_encode(request, response), 200
+
+    def get_backend(self, request):
+        documents = request.__dict__.get('graphql_documents')
+        if documents is None:
+            documents = request.graphql_documents = RequestDocuments(
+                super(GraphQLView, self).get_backend(request))
+        return documents
+
+    def get_operation_type(self, request, query, operation_name):
+        if not query:
+            return None
+        try:
+            document = self.get_backend(request).document_from_string(
+                self.schema, query)
+        except Exception:
+            return None
+        return document.get_operation_type(operation_name)
+
+    def get_cache_key(self, request, query, variables, operation_name):
+        """
+        Key of the response in `response_cache`, only anonymous queries
+        are cached.
+        """
+        if self.response_cache is None or request.user.is_authenticated:
+            return None
+        if self.get_operation_type(request, query,
+                                   operation_name) != 'query':
+            return None
+        return response_key(query_hash(query), operation_name, variables)
+
+    def execute_graphql_request(self, request, data, query, variables,
+                                operation_name, show_graphiql=False):
+        execute = super(GraphQLView, self).execute_graphql_request
+        if self.get_operation_type(request, query,
+                                   operation_name) == 'mutation':
+            try:
+                with self.mutation_atomic():
+                    return execute(request, data, query, variables,
+                                   operation_name, show_graphiql)
+            finally:
+                pin_primary(request)
+        # responses filling the cache are read from the primary, a lagging
+        # replica would keep them stale past their invalidation
+        filling_cache = 'graphql_cache_tags' in request.__dict__
+        with use_replica(not is_pinned(request) and not filling_cache):
+            return execute(request, data, query, variables, operation_name,
+                           show_graphiql)
+
+    def get_operation_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, operation_id = \
+            self.get_graphql_params(request, data)
+
+        cache_key = self.get_cache_key(request, query, variables,
+                                       operation_name)
+        if cache_key:
+            response = self.response_cache.get(cache_key)
+            if response is not None:
+                return self.format_response(
+                    request, dict(response), 200, operation_id,
+                    show_graphiql)
+            request.graphql_cache_tags = set()
+
+        try:
+            execution_result = self.execute_graphql_request(
+                request, data, query, variables, operation_name,
+                show_graphiql)
+        finally:
+            tags = request.__dict__.pop('graphql_cache_tags', None)
+
+        status_code = 200
+        if execution_result:
+            response = {}
+
+            if execution_result.errors:
+                response['errors'] = [
+                    self.format_error(e) for e in execution_result.errors]
+
+            if execution_result.invalid:
+                status_code = 400
+            else:
+                response['data'] = execution_result.data
+
+            extensions = getattr(execution_result, 'extensions', None)
+            if extensions:
+                response['extensions'] = extensions
+
+            if cache_key and not execution_result.errors:
+                self.response_cache.set(cache_key, response, tags)
+
+            return self.format_response(request, response, status_code,
+                                        operation_id, show_graphiql)
+
+        return None, status_code
+
+    def format_response(self, request, response, status_code, operation_id,
+                        show_graphiql=False):
+        if self.batch:
+            # the status of the batch is the one of the HTTP response
+            response['id'] = operation_id
+            response['status'] = status_code
+            status_code = 200
+
+        result = self.json_encode(request, response, pretty=show_graphiql)
+        return result, status_code
+
+
+def persisted_queries(schema, backend):
+    """
+    The registry of GRAPHQL_PERSISTED_QUERIES, loaded when the URLconf is
+    imported so a malformed manifest fails at startup.
+    """
+    if not settings.GRAPHQL_PERSISTED_QUERIES and \
+            not settings.GRAPHQL_PERSISTED_QUERIES_ONLY:
+        return None
+    persisted = PersistedQueries(settings.GRAPHQL_PERSISTED_QUERIES)
+    persisted.load(schema, backend)
+    return persisted
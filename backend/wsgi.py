@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 application = get_wsgi_application()
+
+# one invalidation listener per worker, see db.invalidation
+from db.invalidation import start_listener  # noqa: E402
+start_listener()
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+from db.operations import AddTipIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0011_auto_20190812_1246'),
+        ('commenting', '0005_auto_20190812_1246'),
+    ]
+
+    operations = [
+        AddTipIndex('comment'),
+    ]
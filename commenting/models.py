@@ -25,6 +25,7 @@ def update_count(comment):
         parent=stats.document
     ).count()
     stats.save()
+    stats.document.send_changed()
 
 
 class CommentStats(models.Model):
@@ -1,10 +1,11 @@
 import graphene
 from graphene import relay
-from graphene_django import DjangoConnectionField, DjangoObjectType
+from graphene_django import DjangoObjectType
 
 from db.models import DocumentID
 from db.types_revision import DocumentNode, DocumentBase
-from db.graphene import CountedConnection
+from db.graphene import CountedConnection, DjangoConnectionField
+from db.loaders import get_loaders
 from voting.models_graphql import VotesNode
 
 from .models import Comment as CommentModel, CommentStats
@@ -24,9 +25,16 @@ class Commenting(graphene.ObjectType):
 
     def stats(self):
         if not hasattr(self, '_stats'):
-            self._stats, created = CommentStats.objects.get_or_create(
-                document_id=self._document.pk
-            )
+            # loaded with select_related by db.optimizer, documents without
+            # a stats row yet are read as zeros
+            related = CommentStats._meta.get_field('document').remote_field
+            if related.is_cached(self._document):
+                self._stats = related.get_cached_value(self._document) or \
+                    CommentStats(document_id=self._document.pk)
+            else:
+                self._stats, created = CommentStats.objects.get_or_create(
+                    document_id=self._document.pk
+                )
         return self._stats
 
     def resolve_count(self, info):
@@ -44,9 +52,11 @@ class CommentsNode(graphene.Interface):
     commenting = graphene.Field(Commenting)
 
     def resolve_commenting(self, info):
-        c = Commenting(id=self.document.pk)
-        c._document = self.document
-        return c
+        def commenting(document):
+            c = Commenting(id=document.pk)
+            c._document = document
+            return c
+        return get_loaders(info.context).document(self).then(commenting)
 
 
 class Comment(DjangoObjectType, DocumentBase):
@@ -4,7 +4,7 @@ from graphql_relay.connection.arrayconnection import offset_to_cursor
 
 from accounts.decorators import login_required
 from accounts.permissions import has_permission
-from db.models_graphql import Document
+from db.models_graphql import get_parent_document
 from backend.mutations import Mutation
 from .models_graphql import Comment, Commenting
 
@@ -28,8 +28,7 @@ class CommentCreate(Mutation):
     def mutate_and_get_payload(cls, root, info, **input):
         comment = Comment._meta.model()
 
-        gid_type, gid = from_global_id(input.get('parent'))
-        comment.parent = Document._meta.model.objects.get(pk=gid)
+        comment.parent = get_parent_document(input.get('parent'))
 
         comment = comment_save(comment, input, info.context)
 
@@ -40,7 +39,7 @@ class CommentCreate(Mutation):
         return CommentCreate(
             comment=Comment._meta.connection.Edge(node=comment,
                                             cursor=offset_to_cursor(0)),
-            commenting=Commenting.get_node(info, id=gid)
+            commenting=Commenting.get_node(info, id=comment.parent_id)
         )
 
 
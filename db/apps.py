@@ -3,3 +3,32 @@ from django.apps import AppConfig
 
 class DbConfig(AppConfig):
     name = 'db'
+
+    def ready(self):
+        from . import counting, invalidation, object_cache, response_cache
+        from django.db.models.signals import (
+            m2m_changed, post_delete, post_save
+        )
+        from .signals import documents_changed
+
+        documents_changed.connect(
+            counting.documents_changed_receiver,
+            dispatch_uid='db.counting.documents_changed_receiver')
+        documents_changed.connect(
+            response_cache.documents_changed_receiver,
+            dispatch_uid='db.response_cache.documents_changed_receiver')
+        documents_changed.connect(
+            object_cache.documents_changed_receiver,
+            dispatch_uid='db.object_cache.documents_changed_receiver')
+        documents_changed.connect(
+            invalidation.documents_changed_receiver,
+            dispatch_uid='db.invalidation.documents_changed_receiver')
+        post_save.connect(counting.post_save_receiver,
+                          dispatch_uid='db.counting.post_save_receiver')
+        post_delete.connect(counting.post_save_receiver,
+                            dispatch_uid='db.counting.post_delete_receiver')
+        m2m_changed.connect(counting.m2m_changed_receiver,
+                            dispatch_uid='db.counting.m2m_changed_receiver')
+        m2m_changed.connect(
+            response_cache.m2m_changed_receiver,
+            dispatch_uid='db.response_cache.m2m_changed_receiver')
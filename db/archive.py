@@ -0,0 +1,134 @@
+"""
+Cold storage for old revisions.
+
+Non-tip rows of a DocumentBase model are moved to `<table>_archive`, a
+Postgres child table that INHERITS from the model's table, so reads through
+`objects_revisions` (and the m2m tables, archived the same way) still see
+them. The archive is created with CHECK (is_tip IS NULL), which lets the
+planner skip it for every `objects` query.
+"""
+from django.db import connection, transaction
+
+from .models import DocumentBase, Revision
+
+
+def archive_table(table):
+    return '%s_archive' % table
+
+
+def get_archived_models():
+    from django.apps import apps
+    return [model for model in apps.get_models()
+            if issubclass(model, DocumentBase)]
+
+
+def get_m2m_tables(model):
+    tables = []
+    for field in model._meta.local_many_to_many:
+        through = field.remote_field.through
+        if through._meta.auto_created:
+            from_field = through._meta.get_field(field.m2m_field_name())
+            tables.append((through._meta.db_table, from_field.column))
+    return tables
+
+
+def has_archive(model):
+    # checked on every call, another process may have created it since
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [
+            connection.ops.quote_name(archive_table(model._meta.db_table))])
+        return cursor.fetchone()[0]
+
+
+def create_archive(model):
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TABLE IF NOT EXISTS {archive} (CHECK (is_tip IS NULL)) '
+            'INHERITS ({table})'.format(
+                archive=qn(archive_table(table)), table=qn(table)))
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS {index} ON {archive} '
+            '(document_id)'.format(
+                index=qn('%s_document_id' % archive_table(table)[-51:]),
+                archive=qn(archive_table(table))))
+        for m2m_table, column in get_m2m_tables(model):
+            cursor.execute(
+                'CREATE TABLE IF NOT EXISTS {archive} () '
+                'INHERITS ({table})'.format(
+                    archive=qn(archive_table(m2m_table)),
+                    table=qn(m2m_table)))
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS {index} ON {archive} '
+                '({column})'.format(
+                    index=qn('%s_from' % archive_table(m2m_table)[-58:]),
+                    archive=qn(archive_table(m2m_table)),
+                    column=qn(column)))
+    
+def move_rows(cursor, source, target, column, ids):
+    qn = connection.ops.quote_name
+    cursor.execute(
+        'WITH moved AS ('
+        'DELETE FROM ONLY {source} WHERE {column} = ANY(%s) RETURNING *'
+        ') INSERT INTO {target} SELECT * FROM moved'.format(
+            source=qn(source), target=qn(target), column=qn(column)),
+        [list(ids)])
+    return cursor.rowcount
+
+
+def archive_revisions(model, revision_ids):
+    """
+    Moves the given non-tip revisions of `model` to its archive tables.
+    """
+    table = model._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        # the m2m rows go first, the archive has no foreign keys
+        for m2m_table, column in get_m2m_tables(model):
+            move_rows(cursor, m2m_table, archive_table(m2m_table), column,
+                      revision_ids)
+        return move_rows(cursor, table, archive_table(table), 'revision_id',
+                         revision_ids)
+
+
+def restore_revisions(model, revision_ids):
+    """
+    Moves archived revisions back, needed before one of them becomes the
+    tip again (e.g. on `RevisionRevert`).
+    """
+    if not has_archive(model):
+        return 0
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            'WITH moved AS ('
+            'DELETE FROM {archive} WHERE revision_id = ANY(%s) RETURNING *'
+            ') INSERT INTO {table} SELECT * FROM moved'.format(
+                archive=qn(archive_table(table)), table=qn(table)),
+            [list(revision_ids)])
+        restored = cursor.rowcount
+        for m2m_table, column in get_m2m_tables(model):
+            cursor.execute(
+                'WITH moved AS ('
+                'DELETE FROM {archive} WHERE {column} = ANY(%s) RETURNING *'
+                ') INSERT INTO {table} SELECT * FROM moved'.format(
+                    archive=qn(archive_table(m2m_table)),
+                    table=qn(m2m_table), column=qn(column)),
+                [list(revision_ids)])
+        return restored
+
+
+def get_archivable_ids(model, before, batch_size, after_id=0):
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT t.revision_id FROM ONLY {table} t '
+            'INNER JOIN {revision} r ON r.id = t.revision_id '
+            'WHERE t.is_tip IS NULL AND t.revision_id > %s '
+            'AND r.created_at < %s '
+            'ORDER BY t.revision_id LIMIT %s'.format(
+                table=qn(model._meta.db_table),
+                revision=qn(Revision._meta.db_table)),
+            [after_id, before, batch_size])
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,152 @@
+"""
+Count strategies for connection totals.
+
+- exact: SELECT COUNT(*)
+- cached: exact count, read from the primary, kept in the cache, keyed by
+  the generation numbers of every table the count reads (joins and
+  subqueries included). A model's generation is bumped when one of its
+  documents changes, on its post_save/post_delete and on m2m changes of
+  its through tables. Writes that send no signal (QuerySet.update, raw
+  SQL) are only picked up when the entry expires after COUNT_CACHE_TIMEOUT
+- estimated: planner estimate (pg_class.reltuples for unfiltered tables,
+  EXPLAIN rows otherwise), falling back to an exact count below
+  COUNT_ESTIMATE_THRESHOLD rows
+"""
+import hashlib
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .routers import aggregate_db
+
+EXACT = 'exact'
+CACHED = 'cached'
+ESTIMATED = 'estimated'
+
+STRATEGIES = (EXACT, CACHED, ESTIMATED)
+
+
+def generation_key(model):
+    return 'db:count:generation:%s' % model._meta.label_lower
+
+
+def get_generations(models):
+    keys = sorted(generation_key(model) for model in models)
+    generations = cache.get_many(keys)
+    return [generations.get(key, 0) for key in keys]
+
+
+def invalidate_counts(*models):
+    for model in models:
+        key = generation_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def invalidate_on_commit(*models):
+    # bumped before the commit, a concurrent count could still cache the
+    # old value under the new generation
+    transaction.on_commit(partial(invalidate_counts, *models))
+
+
+def documents_changed_receiver(sender, **kwargs):
+    from .models import DocumentID, Revision
+    invalidate_counts(sender, Revision, DocumentID)
+
+
+def post_save_receiver(sender, **kwargs):
+    invalidate_on_commit(sender)
+
+
+def m2m_changed_receiver(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_on_commit(sender)
+
+
+_models_by_table = None
+
+
+def get_tables_models(sql):
+    """
+    Models whose tables appear in `sql`.
+    """
+    global _models_by_table
+    if _models_by_table is None:
+        _models_by_table = {
+            model._meta.db_table: model
+            for model in apps.get_models(include_auto_created=True)
+        }
+    return [model for table, model in _models_by_table.items()
+            if '"%s"' % table in sql]
+
+
+def count_cache_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.sha1(
+        ('%s:%r' % (sql, params)).encode('utf-8')).hexdigest()
+    models = set(get_tables_models(sql)) | {queryset.model}
+    generations = ':'.join(str(g) for g in get_generations(models))
+    return 'db:count:%s:%s:%s' % (queryset.model._meta.label_lower,
+                                   generations, digest)
+
+
+def cached_count(queryset):
+    """
+    (count, strategy used)
+    """
+    key = count_cache_key(queryset)
+    count = cache.get(key)
+    if count is not None:
+        return count, CACHED
+    # a lagging replica would keep the count stale past its invalidation
+    count = queryset.using(DEFAULT_DB_ALIAS).count()
+    cache.set(key, count, settings.COUNT_CACHE_TIMEOUT)
+    return count, EXACT
+
+
+def estimate_count(queryset):
+    query = queryset.query
+    with connections[queryset.db].cursor() as cursor:
+        if not query.where and not query.distinct and \
+                len(query.alias_map) <= 1:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass', [query.get_meta().db_table])
+            row = cursor.fetchone()
+            # never analyzed tables have reltuples of -1 (or 0)
+            if row and row[0] > 0:
+                return row[0]
+            return None
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+        return plan[0]['Plan']['Plan Rows']
+
+
+def estimated_count(queryset):
+    """
+    (count, strategy used)
+    """
+    estimate = estimate_count(queryset)
+    if estimate is None or estimate < settings.COUNT_ESTIMATE_THRESHOLD:
+        return queryset.count(), EXACT
+    return estimate, ESTIMATED
+
+
+def count_queryset(queryset, strategy=EXACT):
+    """
+    Counts `queryset` with `strategy`, returns the count and the strategy
+    actually used. Counts are read from a replica.
+    """
+    queryset = queryset.using(aggregate_db())
+    if strategy == CACHED:
+        return cached_count(queryset)
+    if strategy == ESTIMATED:
+        return estimated_count(queryset)
+    return queryset.count(), EXACT
@@ -0,0 +1,107 @@
+from django.conf import settings
+from django.core.cache import cache
+
+IGNORED_FIELDS = ('revision', 'document', 'is_tip')
+
+
+def get_field_values(obj):
+    values = {}
+    if obj is None:
+        return values
+    exclude = getattr(obj, 'PRIVATE_FIELDS', ())
+    for field in obj._meta.concrete_fields:
+        if field.name in IGNORED_FIELDS or field.name in exclude:
+            continue
+        values[field.name] = field.value_to_string(obj)
+    return values
+
+
+def get_m2m_values(model, revision_ids):
+    """
+    {revision id: {field name: related ids}} of `model` rows, the through
+    rows of all the revisions are read with one query per m2m field.
+    """
+    values = {pk: {} for pk in revision_ids}
+    for field in model._meta.many_to_many:
+        for field_values in values.values():
+            field_values[field.name] = set()
+        if not values:
+            continue
+        through = field.remote_field.through
+        from_ = through._meta.get_field(field.m2m_field_name())
+        to = through._meta.get_field(field.m2m_reverse_field_name())
+        rows = through._default_manager.filter(**{
+            '%s__in' % from_.attname: list(values)
+        }).values_list(from_.attname, to.attname)
+        for revision_id, related_id in rows:
+            values[revision_id][field.name].add(related_id)
+    return values
+
+
+def diff_objects(old, new, m2m_values=None):
+    """
+    Field-level and m2m-level differences between two revisions of the same
+    document, `old` may be None for the first revision. `m2m_values` are the
+    ones of `get_m2m_values` when they were loaded in a batch.
+    """
+    if m2m_values is None:
+        m2m_values = get_m2m_values(new.__class__, [
+            obj.pk for obj in (old, new) if obj is not None])
+    changes = []
+
+    old_values = get_field_values(old)
+    for name, value in sorted(get_field_values(new).items()):
+        old_value = old_values.get(name)
+        if old_value != value:
+            changes.append({'field': name, 'old': old_value, 'new': value})
+
+    old_m2m = m2m_values.get(old.pk, {}) if old is not None else {}
+    for name, ids in sorted(m2m_values.get(new.pk, {}).items()):
+        old_ids = old_m2m.get(name, set())
+        if old_ids != ids:
+            changes.append({
+                'field': name,
+                'added': sorted(ids - old_ids),
+                'removed': sorted(old_ids - ids),
+            })
+
+    return changes
+
+
+def diff_cache_key(old_revision_id, new_revision_id):
+    return 'db:diff:%s:%d' % (old_revision_id or '', new_revision_id)
+
+
+def get_cached_diff(old_revision_id, new_revision_id):
+    return cache.get(diff_cache_key(old_revision_id, new_revision_id))
+
+
+def set_cached_diff(old_revision_id, new_revision_id, changes):
+    cache.set(diff_cache_key(old_revision_id, new_revision_id), changes,
+              settings.DIFF_CACHE_TIMEOUT)
+
+
+def invalidate_diffs(pairs):
+    """
+    Drops the cached diffs of the (old, new) revision id pairs, needed when
+    one of the rows is changed in place by an `update_fields` save.
+    """
+    cache.delete_many([diff_cache_key(old, new) for old, new in pairs])
+
+
+def get_revision_diff(revision, parent=None):
+    """
+    Differences between `revision` and `parent` (defaults to the revision's
+    parent). Revision rows rarely change, so diffs are cached for
+    DIFF_CACHE_TIMEOUT and dropped when a row is updated in place.
+    """
+    parent_id = parent.pk if parent else revision.parent_id
+
+    changes = get_cached_diff(parent_id, revision.pk)
+    if changes is None:
+        if parent is None and parent_id:
+            parent = revision.parent
+        changes = diff_objects(parent.get_object() if parent else None,
+                               revision.get_object())
+        set_cached_diff(parent_id, revision.pk, changes)
+    return changes
@@ -0,0 +1,99 @@
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from .models import Revision
+
+
+def serialize_object(obj):
+    if obj is None:
+        return None
+    exclude = getattr(obj, 'PRIVATE_FIELDS', ())
+    data = {}
+    for field in obj._meta.concrete_fields:
+        if field.name in exclude:
+            continue
+        value = field.value_from_object(obj)
+        if isinstance(value, FieldFile):
+            value = value.name or None
+        elif hasattr(value, 'ewkt'):
+            # geometry fields
+            value = value.ewkt
+        data[field.attname] = value
+    return data
+
+
+def get_objects(revisions):
+    """
+    Rows written by each revision, one query per model.
+    """
+    ids_by_model = {}
+    for revision in revisions:
+        model = ContentType.objects.get_for_id(
+            revision.document.content_type_id).model_class()
+        ids_by_model.setdefault(model, []).append(revision.pk)
+
+    objects = {}
+    for model, ids in ids_by_model.items():
+        if model is None:
+            continue
+        objects.update(model.objects_revisions.in_bulk(ids))
+    return objects
+
+
+def iter_events(after_id=0, batch_size=500, limit=None, lag=None,
+                privacy=None):
+    """
+    Yields revision events ordered by Revision.id, reading `batch_size`
+    revisions at a time so memory stays constant.
+
+    Ids are taken before the transaction commits, so a revision can show
+    up after higher ids were already delivered. Revisions younger than
+    `lag` seconds (REVISION_FEED_LAG by default) are held back, so a
+    consumer never moves past a transaction that is still running.
+    Only documents with the given `privacy` are included when it is set.
+    """
+    if lag is None:
+        lag = settings.REVISION_FEED_LAG
+    revisions = Revision.objects.select_related('document').order_by('id')
+    if privacy is not None:
+        revisions = revisions.filter(document__privacy=privacy)
+
+    sent = 0
+    while limit is None or sent < limit:
+        size = batch_size if limit is None else min(batch_size, limit - sent)
+        batch = list(revisions.filter(
+            id__gt=after_id,
+            created_at__lte=timezone.now() - timedelta(seconds=lag),
+        )[:size])
+        if not batch:
+            return
+
+        objects = get_objects(batch)
+        for revision in batch:
+            content_type = ContentType.objects.get_for_id(
+                revision.document.content_type_id)
+            yield {
+                'id': revision.pk,
+                'type': revision.type,
+                'index': revision.index,
+                'created_at': revision.created_at,
+                'document_id': revision.document_id,
+                'content_type': '%s.%s' % (content_type.app_label,
+                                           content_type.model),
+                'author_id': revision.author_id,
+                'message': revision.message,
+                'object': serialize_object(objects.get(revision.pk)),
+            }
+
+        after_id = batch[-1].pk
+        sent += len(batch)
+
+
+def to_ndjson(event):
+    return json.dumps(event, cls=DjangoJSONEncoder) + '\n'
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import connection, models
 from django.db.models.fields.related import lazy_related_operation
 from django.db.models.fields.related_descriptors import ManyToManyDescriptor
 from django.utils.functional import curry
@@ -52,6 +52,40 @@ def create_many_to_many_intermediary_model(field, klass):
 
 
 class ManyToManyField(models.ManyToManyField):
+    def __init__(self, *args, **kwargs):
+        # copy the previous revision's relations to each new revision
+        self.copy_forward = kwargs.pop('copy_forward', True)
+        super(ManyToManyField, self).__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super(ManyToManyField, self).deconstruct()
+        if not self.copy_forward:
+            kwargs['copy_forward'] = False
+        return name, path, args, kwargs
+
+    def copy_revisions(self, revision_ids):
+        """
+        Copies the through rows of each (old, new) revision id pair in a
+        single INSERT ... SELECT.
+        """
+        if not revision_ids:
+            return
+        through = self.remote_field.through
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} ({from_}, {to}) '
+                'SELECT revisions.new_id, {table}.{to} FROM {table} '
+                'INNER JOIN (VALUES {values}) AS revisions (old_id, new_id) '
+                'ON {table}.{from_} = revisions.old_id'.format(
+                    table=qn(through._meta.db_table),
+                    from_=qn(through._meta.get_field(
+                        self.m2m_field_name()).column),
+                    to=qn(through._meta.get_field(
+                        self.m2m_reverse_field_name()).column),
+                    values=', '.join(['(%s, %s)'] * len(revision_ids)),
+                ), [value for pair in revision_ids for value in pair])
+
     def contribute_to_class(self, cls, name, **kwargs):
         # To support multiple relations to self, it's useful to have a non-None
         # related name on symmetrical relations for internal reasons. The
@@ -1,14 +1,143 @@
+from functools import partial
+
 import graphene
+from django.db.models import QuerySet
+from graphene_django.fields import \
+    DjangoConnectionField as BaseDjangoConnectionField
+from graphene_django.filter import \
+    DjangoFilterConnectionField as BaseDjangoFilterConnectionField
+from graphene_django.utils import maybe_queryset
+from promise import Promise
+
+from .counting import CACHED, ESTIMATED, EXACT, count_queryset
+from .optimizer import optimize_queryset
+from .pagination import (
+    get_ordering, is_keyset_args, resolve_keyset_connection
+)
+
+
+class CountStrategy(graphene.Enum):
+    EXACT = EXACT
+    CACHED = CACHED
+    ESTIMATED = ESTIMATED
+
+
+def get_total_count(connection):
+    """
+    (count, strategy used) of the connection, counted on first use with the
+    field's `count_strategy`.
+    """
+    if connection.length is None:
+        connection.length, connection.length_strategy = count_queryset(
+            connection.iterable,
+            getattr(connection, 'count_strategy', EXACT))
+    return connection.length, getattr(connection, 'length_strategy', EXACT)
+
 
 class CountedConnection(graphene.Connection):
     class Meta:
         abstract = True
 
     total_count = graphene.Int()
+    total_count_strategy = graphene.Field(CountStrategy)
     edge_count = graphene.Int()
 
     def resolve_total_count(root, info, **kwargs):
-        return root.length
+        return get_total_count(root)[0]
+
+    def resolve_total_count_strategy(root, info, **kwargs):
+        return get_total_count(root)[1]
 
     def resolve_edge_count(root, info, **kwargs):
         return len(root.edges)
+
+
+def optimized_resolver(resolver, node_type, root, info, **args):
+    def optimize(iterable):
+        if iterable is None:
+            return None
+        return optimize_queryset(maybe_queryset(iterable), info, node_type)
+
+    iterable = resolver(root, info, **args)
+    if Promise.is_thenable(iterable):
+        return Promise.resolve(iterable).then(optimize)
+    return optimize(iterable)
+
+
+class OptimizedConnectionMixin(object):
+    """
+    Runs `db.optimizer` on the queryset of the connection, whether it comes
+    from the field's resolver or from the model's default manager.
+    """
+    def get_resolver(self, parent_resolver):
+        return super(OptimizedConnectionMixin, self).get_resolver(
+            partial(optimized_resolver, parent_resolver, self.node_type))
+
+    @classmethod
+    def resolve_queryset(cls, connection, queryset, info, args):
+        queryset = super(OptimizedConnectionMixin, cls).resolve_queryset(
+            connection, queryset, info, args)
+        return optimize_queryset(maybe_queryset(queryset), info,
+                                 connection._meta.node)
+
+
+def with_count_strategy(resolver, strategy, root, info, **args):
+    def set_strategy(connection):
+        if connection is not None:
+            connection.count_strategy = strategy
+        return connection
+
+    connection = resolver(root, info, **args)
+    if Promise.is_thenable(connection):
+        return Promise.resolve(connection).then(set_strategy)
+    return set_strategy(connection)
+
+
+class CountStrategyMixin(object):
+    """
+    Adds the `count_strategy` argument (see `db.counting`) used for the
+    totalCount of the connection.
+    """
+    def __init__(self, *args, **kwargs):
+        self.count_strategy = kwargs.pop('count_strategy', EXACT)
+        super(CountStrategyMixin, self).__init__(*args, **kwargs)
+
+    def get_resolver(self, parent_resolver):
+        return partial(
+            with_count_strategy,
+            super(CountStrategyMixin, self).get_resolver(parent_resolver),
+            self.count_strategy)
+
+
+class KeysetConnectionMixin(object):
+    """
+    Paginates querysets with `db.pagination` keyset cursors, offset cursors
+    and iterables that aren't querysets use the default connection.
+    """
+    @classmethod
+    def resolve_connection(cls, connection, default_manager, args, iterable):
+        queryset = maybe_queryset(
+            default_manager if iterable is None else iterable)
+        if isinstance(queryset, QuerySet) and queryset._fields is None:
+            if queryset.model.objects is not default_manager:
+                queryset = cls.merge_querysets(
+                    maybe_queryset(default_manager), queryset)
+            ordering = get_ordering(queryset)
+            if ordering is not None and is_keyset_args(args, ordering):
+                return resolve_keyset_connection(connection, queryset, args,
+                                                 ordering)
+
+        return super(KeysetConnectionMixin, cls).resolve_connection(
+            connection, default_manager, args, iterable)
+
+
+class DjangoConnectionField(CountStrategyMixin, OptimizedConnectionMixin,
+                            KeysetConnectionMixin, BaseDjangoConnectionField):
+    pass
+
+
+class DjangoFilterConnectionField(CountStrategyMixin,
+                                  OptimizedConnectionMixin,
+                                  KeysetConnectionMixin,
+                                  BaseDjangoFilterConnectionField):
+    pass
@@ -0,0 +1,200 @@
+"""
+Cache invalidation between processes.
+
+`db.signals.documents_changed` only reaches the receivers of the process
+that wrote, so every committed change is also published with Postgres
+NOTIFY on CHANNEL as {"pid", "ct", "tips": [[document_id, tip], ...]}.
+Each worker runs a `Listener` thread on its own connection that LISTENs on
+the channel, coalesces the events of a burst and sends `documents_changed`
+again locally with `remote=True`, so its in-process caches are evicted the
+same way the writer's are. Events can be lost while the connection is down,
+so the local caches are flushed whenever it reconnects.
+
+Enabled with INVALIDATION_BUS. Without it the object cache expires its
+entries after OBJECT_CACHE_TIMEOUT, as nothing evicts them in the other
+processes, and `start_listener` warns about it.
+"""
+import json
+import logging
+import os
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import object_cache
+from .signals import documents_changed
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'db_documents_changed'
+# NOTIFY payloads must be shorter than 8000 bytes
+MAX_TIPS = 200
+
+
+def get_payloads(model, tips):
+    content_type_id = ContentType.objects.get_for_model(model).pk
+    tips = sorted(tips.items())
+    for i in range(0, len(tips), MAX_TIPS):
+        yield json.dumps({
+            'pid': os.getpid(),
+            'ct': content_type_id,
+            'tips': tips[i:i + MAX_TIPS],
+        })
+
+
+def publish(model, tips, using=DEFAULT_DB_ALIAS):
+    with connections[using].cursor() as cursor:
+        for payload in get_payloads(model, tips):
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, payload])
+
+
+def documents_changed_receiver(sender, tips, remote=False, **kwargs):
+    if settings.INVALIDATION_BUS and not remote:
+        publish(sender, tips)
+
+
+def coalesce(payloads, pid=None):
+    """
+    {model: tips} of the events in `payloads`, skipping the ones sent by
+    the process `pid`.
+    """
+    changes = {}
+    for payload in payloads:
+        try:
+            event = json.loads(payload)
+            if event['pid'] == pid:
+                continue
+            model = ContentType.objects.get_for_id(event['ct']).model_class()
+        except (ValueError, KeyError, ContentType.DoesNotExist):
+            logger.warning('Invalid invalidation event: %r', payload)
+            continue
+        if model is None:
+            continue
+        changes.setdefault(model, {}).update(
+            (document_id, tip) for document_id, tip in event['tips'])
+    return changes
+
+
+def flush_local_caches():
+    """
+    Drops everything cached in this process.
+    """
+    object_cache.local.clear()
+    aliases = {DEFAULT_DB_ALIAS, settings.OBJECT_CACHE,
+               settings.GRAPHQL_RESPONSE_CACHE}
+    for alias in aliases:
+        if alias and isinstance(caches[alias], LocMemCache):
+            caches[alias].clear()
+
+
+class Listener(threading.Thread):
+    """
+    Evicts the caches of this process when other processes change
+    documents, events arriving within `delay` seconds of each other are
+    handled as one.
+    """
+    daemon = True
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, delay=0.05, timeout=5,
+                 retry=1):
+        super(Listener, self).__init__(name='db-invalidation-listener')
+        self.using = using
+        self.delay = delay
+        self.timeout = timeout
+        self.retry = retry
+        self.pid = os.getpid()
+        self.connects = 0
+        self.listening = threading.Event()
+        self.stopped = threading.Event()
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        try:
+            while not self.stopped.is_set():
+                try:
+                    self.listen()
+                except Exception:
+                    logger.exception('Invalidation listener disconnected')
+                    self.listening.clear()
+                    self.close()
+                    self.stopped.wait(self.retry)
+        finally:
+            self.close()
+
+    def close(self):
+        try:
+            connections[self.using].close()
+        except Exception:
+            pass
+
+    def connect(self):
+        connection = connections[self.using]
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute('LISTEN %s' % CHANNEL)
+        self.connects += 1
+        if self.connects > 1:
+            # whatever changed while disconnected is unknown
+            flush_local_caches()
+        self.listening.set()
+        return connection.connection
+
+    def wait(self, pg_connection, timeout):
+        # notifications can also arrive with the results of other queries
+        if not pg_connection.notifies and select.select(
+                [pg_connection], [], [], timeout) == ([], [], []):
+            return []
+        pg_connection.poll()
+        payloads = [notify.payload for notify in pg_connection.notifies]
+        del pg_connection.notifies[:]
+        return payloads
+
+    def listen(self):
+        pg_connection = self.connect()
+        while not self.stopped.is_set():
+            payloads = self.wait(pg_connection, self.timeout)
+            if not payloads:
+                continue
+            deadline = time.time() + self.delay
+            while time.time() < deadline:
+                payloads += self.wait(pg_connection, deadline - time.time())
+            self.dispatch(payloads)
+
+    def dispatch(self, payloads):
+        for model, tips in coalesce(payloads, self.pid).items():
+            documents_changed.send(sender=model, tips=tips, remote=True)
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def start_listener():
+    """
+    Starts the listener of this process once, again after a fork. Without
+    INVALIDATION_BUS the caches of this process only drop the changes of
+    other processes when their entries expire, which is logged.
+    """
+    global _listener
+    if not settings.INVALIDATION_BUS:
+        logger.warning(
+            'INVALIDATION_BUS is off, changes made by other processes are '
+            'seen once cache entries expire: after %ss in the object cache, '
+            '%ss in a process-local response cache.',
+            settings.OBJECT_CACHE_TIMEOUT,
+            settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT)
+        return None
+    with _listener_lock:
+        if _listener is None or _listener.pid != os.getpid() or \
+                not _listener.is_alive():
+            _listener = Listener()
+            _listener.start()
+        return _listener
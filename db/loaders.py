@@ -0,0 +1,185 @@
+from promise import Promise
+from promise.dataloader import DataLoader
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import OuterRef, Subquery
+
+from .diff import get_m2m_values
+from .models import DocumentID, Revision
+
+
+class DocumentIDLoader(DataLoader):
+    def batch_load_fn(self, ids):
+        documents = DocumentID.objects.in_bulk(ids)
+        return Promise.resolve([documents.get(pk) for pk in ids])
+
+
+class RevisionLoader(DataLoader):
+    def batch_load_fn(self, ids):
+        revisions = Revision.objects.in_bulk(ids)
+        return Promise.resolve([revisions.get(pk) for pk in ids])
+
+
+def get_creator_ids(document_ids):
+    return dict(DocumentID.objects.filter(pk__in=document_ids).annotate(
+        creator_id=Subquery(Revision.objects.filter(
+            pk=OuterRef('revision_created_id')).values('author_id'))
+    ).values_list('pk', 'creator_id'))
+
+
+class CreatorLoader(DataLoader):
+    """
+    Loads the document id of the author of each document's first revision.
+    """
+    def __init__(self, creator_ids, **kwargs):
+        self.creator_ids = creator_ids
+        super(CreatorLoader, self).__init__(**kwargs)
+
+    def batch_load_fn(self, document_ids):
+        self.creator_ids.update(get_creator_ids(document_ids))
+        return Promise.resolve([self.creator_ids.get(pk)
+                                for pk in document_ids])
+
+
+class TipLoader(DataLoader):
+    """
+    Loads the current state of `model` documents by document_id, grouping
+    sibling lookups in a single `document_id__in` query.
+    """
+    def __init__(self, model, **kwargs):
+        self.model = model
+        super(TipLoader, self).__init__(**kwargs)
+
+    def batch_load_fn(self, document_ids):
+        objs = {}
+        for obj in self.model.objects.filter(document_id__in=document_ids):
+            objs[obj.document_id] = obj
+        return Promise.resolve([objs.get(pk) for pk in document_ids])
+
+
+class RevisionObjectLoader(DataLoader):
+    """
+    Loads `model` rows by revision id, tip or not, like
+    `DocumentID.get_object` and `Revision.get_object` do.
+    """
+    def __init__(self, model, **kwargs):
+        self.model = model
+        super(RevisionObjectLoader, self).__init__(**kwargs)
+
+    def batch_load_fn(self, revision_ids):
+        objs = self.model.objects_revisions.in_bulk(revision_ids)
+        return Promise.resolve([objs.get(pk) for pk in revision_ids])
+
+
+class M2MValuesLoader(DataLoader):
+    """
+    Loads the m2m related ids of `model` rows by revision id, see
+    `db.diff.get_m2m_values`.
+    """
+    def __init__(self, model, **kwargs):
+        self.model = model
+        super(M2MValuesLoader, self).__init__(**kwargs)
+
+    def batch_load_fn(self, revision_ids):
+        values = get_m2m_values(self.model, revision_ids)
+        return Promise.resolve([values[pk] for pk in revision_ids])
+
+
+class Loaders(object):
+    """
+    Batching loaders and identity map for a single request, loaders are
+    kept per model so they are keyed by (content type, document_id).
+    """
+    def __init__(self):
+        self.documents = DocumentIDLoader()
+        self.revisions = RevisionLoader()
+        self.creator_ids = {}
+        self.creators = CreatorLoader(self.creator_ids)
+        self._tips = {}
+        self._objects = {}
+        self._m2m_values = {}
+
+    def tips(self, model):
+        if model not in self._tips:
+            self._tips[model] = TipLoader(model)
+        return self._tips[model]
+
+    def objects(self, model):
+        if model not in self._objects:
+            self._objects[model] = RevisionObjectLoader(model)
+        return self._objects[model]
+
+    def m2m_values(self, model):
+        if model not in self._m2m_values:
+            self._m2m_values[model] = M2MValuesLoader(model)
+        return self._m2m_values[model]
+
+    def tip(self, model, document_id):
+        if not document_id:
+            return Promise.resolve(None)
+        return self.tips(model).load(document_id)
+
+    def document(self, obj):
+        """
+        DocumentID of `obj`, reusing the instance when it was already loaded
+        with select_related (see `db.optimizer`).
+        """
+        if not obj.document_id:
+            return Promise.resolve(None)
+        if obj._meta.get_field('document').is_cached(obj):
+            self.documents.prime(obj.document_id, obj.document)
+        return self.documents.load(obj.document_id)
+
+    def object(self, document_id):
+        """
+        Batched equivalent of `DocumentID.get_object`.
+        """
+        if not document_id:
+            return Promise.resolve(None)
+
+        def get_object(document):
+            if not document or not document.revision_tip_id:
+                return None
+            model = ContentType.objects.get_for_id(
+                document.content_type_id).model_class()
+            return self.objects(model).load(document.revision_tip_id)
+
+        return self.documents.load(document_id).then(get_object)
+
+    def creator_id(self, document_id):
+        """
+        Synchronous lookup sharing the cache of `creators`.
+        """
+        if document_id not in self.creator_ids:
+            self.creator_ids.update(get_creator_ids([document_id]))
+        return self.creator_ids.get(document_id)
+
+    def revision_object(self, revision):
+        """
+        Batched equivalent of `Revision.get_object`.
+        """
+        def get_object(document):
+            model = ContentType.objects.get_for_id(
+                document.content_type_id).model_class()
+            return self.objects(model).load(revision.pk)
+
+        return self.documents.load(revision.document_id).then(get_object)
+
+
+def get_loaders(context):
+    if not hasattr(context, '_db_loaders'):
+        context._db_loaders = Loaders()
+    return context._db_loaders
+
+
+def clear_loaders(context):
+    if hasattr(context, '_db_loaders'):
+        del context._db_loaders
+
+
+def load_tip(info, model, document_id):
+    return get_loaders(info.context).tip(model, document_id)
+
+
+def load_object(info, document_id):
+    return get_loaders(info.context).object(document_id)
@@ -0,0 +1,56 @@
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from db.archive import (
+    archive_revisions, create_archive, get_archivable_ids, get_archived_models
+)
+
+
+class Command(BaseCommand):
+    help = ('Moves non-tip revisions of DocumentBase models to their archive '
+            'tables in batches')
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*',
+                            help='app_label.ModelName, all if empty')
+        parser.add_argument('--older-than', type=int, default=90,
+                            help='only revisions older than this many days')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0,
+                            help='seconds to wait between batches')
+
+    def handle(self, *args, **options):
+        if options['models']:
+            try:
+                models = [apps.get_model(label)
+                          for label in options['models']]
+            except (LookupError, ValueError) as e:
+                raise CommandError(e)
+        else:
+            models = get_archived_models()
+
+        before = timezone.now() - timedelta(days=options['older_than'])
+
+        for model in models:
+            create_archive(model)
+
+            last_id = 0
+            archived = 0
+            while True:
+                ids = get_archivable_ids(model, before,
+                                         options['batch_size'], last_id)
+                if not ids:
+                    break
+                last_id = ids[-1]
+                archived += archive_revisions(model, ids)
+                self.stdout.write('%s: %d revisions archived' % (
+                    model._meta.label, archived))
+                if options['sleep']:
+                    time.sleep(options['sleep'])
+
+            self.stdout.write(self.style.SUCCESS('%s: done, %d archived' % (
+                model._meta.label, archived)))
@@ -0,0 +1,44 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = ('Compares the plans of the tip queries with and without the '
+            'db_documentid join, run it against a copy of production data')
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='app_label.ModelName')
+        parser.add_argument('--limit', type=int, default=50)
+
+    def explain(self, queryset, count=False):
+        sql, params = queryset.query.sql_with_params()
+        if count:
+            sql = 'SELECT COUNT(*) FROM (%s) subquery' % sql
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def handle(self, *args, **options):
+        try:
+            Model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+
+        limit = options['limit']
+        joined = Model.objects_revisions.filter(
+            is_tip=True, document__deleted_at__isnull=True)
+        queries = (
+            ('page, joined', joined.order_by('document_id')[:limit], False),
+            ('page, tip row',
+             Model.objects.order_by('document_id')[:limit], False),
+            ('count, joined', joined.values('pk').order_by(), True),
+            ('count, tip row', Model.objects.values('pk').order_by(), True),
+        )
+
+        self.stdout.write('%s: %d revisions' % (
+            Model._meta.label, Model.objects_revisions.count()))
+        for title, queryset, count in queries:
+            self.stdout.write('\n-- %s' % title)
+            for line in self.explain(queryset, count):
+                self.stdout.write(line)
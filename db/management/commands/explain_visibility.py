@@ -0,0 +1,58 @@
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from db.models import DocumentID, Friendship
+from db.privacy.choices import PRIVACY_FRIENDS
+
+
+class Command(BaseCommand):
+    help = ('Prints the plan of visible_to for a user, optionally adding '
+            'thousands of friends that are rolled back at the end')
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='app_label.ModelName')
+        parser.add_argument('username')
+        parser.add_argument('--friends', type=int, default=0,
+                            help='fake friends to add before explaining')
+        parser.add_argument('--limit', type=int, default=50)
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def handle(self, *args, **options):
+        try:
+            Model = apps.get_model(options['model'])
+            user = get_user_model().objects.get(username=options['username'])
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+        except get_user_model().DoesNotExist:
+            raise CommandError('User not found')
+
+        with transaction.atomic():
+            if options['friends']:
+                friends = DocumentID.objects.bulk_create([
+                    DocumentID(
+                        content_type=ContentType.objects.get_for_model(
+                            user),
+                        privacy=PRIVACY_FRIENDS,
+                    ) for i in range(options['friends'])
+                ])
+                Friendship.objects.bulk_create([
+                    Friendship(user_id=user.document_id, friend=friend)
+                    for friend in friends
+                ])
+
+            self.stdout.write('%s friends' % Friendship.objects.filter(
+                user_id=user.document_id).count())
+            queryset = Model.objects.visible_to(user).order_by(
+                'document_id')[:options['limit']]
+            for line in self.explain(queryset):
+                self.stdout.write(line)
+
+            transaction.set_rollback(True)
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from db.models import DocumentID, Revision
+
+
+def get_referenced_ids(ids):
+    referenced = set()
+    for rel in DocumentID._meta.related_objects:
+        if rel.many_to_many:
+            through = rel.through
+            for field in through._meta.fields:
+                if field.related_model is DocumentID:
+                    referenced.update(through._base_manager.filter(**{
+                        '%s__in' % field.attname: ids
+                    }).values_list(field.attname, flat=True))
+        elif rel.related_model is Revision and rel.field.name == 'document':
+            # the shadow document never has revisions of its own
+            continue
+        else:
+            referenced.update(rel.related_model._base_manager.filter(**{
+                '%s__in' % rel.field.attname: ids
+            }).values_list(rel.field.attname, flat=True))
+    return referenced
+
+
+def reclaim(ids):
+    """
+    Deletes the DocumentIDs in `ids` that are still unreferenced. Rows
+    inserted with a reference to one of them lock it (FOR KEY SHARE), so
+    once they are locked FOR UPDATE the references are checked again, and
+    the delete is a plain DELETE that fails instead of cascading.
+    """
+    with transaction.atomic():
+        locked = set(DocumentID.objects.select_for_update().filter(
+            pk__in=ids).values_list('pk', flat=True))
+        unused = list(locked - get_referenced_ids(list(locked)))
+        if not unused:
+            return 0
+        Revision.objects.filter(
+            revision_document_id__in=unused
+        ).update(revision_document_id=None)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM {table} WHERE id = ANY(%s)'.format(
+                    table=connection.ops.quote_name(
+                        DocumentID._meta.db_table)),
+                [unused])
+            return cursor.rowcount
+
+
+class Command(BaseCommand):
+    help = ('Reclaims the DocumentID rows allocated for revisions that '
+            'nothing references')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = Revision.objects.filter(
+            revision_document_id__isnull=False).count()
+        last_id = 0
+        processed = 0
+        reclaimed = 0
+
+        while True:
+            batch = list(Revision.objects.filter(
+                id__gt=last_id,
+                revision_document_id__isnull=False
+            ).order_by('id').values_list(
+                'id', 'revision_document_id')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            processed += len(batch)
+
+            ids = [document_id for pk, document_id in batch]
+            unused = set(ids) - get_referenced_ids(ids)
+            if unused:
+                reclaimed += reclaim(unused)
+
+            self.stdout.write('%d/%d revisions, %d documents reclaimed' % (
+                processed, total, reclaimed))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from db.feed import iter_events, to_ndjson
+from db.models import FeedCursor
+
+
+class Command(BaseCommand):
+    help = ('Writes revision events as NDJSON to stdout, resuming from the '
+            'cursor stored for the consumer')
+
+    def add_arguments(self, parser):
+        parser.add_argument('consumer', help='name of the durable cursor')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--limit', type=int, default=None)
+        parser.add_argument('--reset', action='store_true',
+                            help='replay from the first revision')
+
+    def handle(self, *args, **options):
+        cursor, created = FeedCursor.objects.get_or_create(
+            name=options['consumer'])
+        if options['reset']:
+            cursor.revision_id = 0
+
+        batch_size = options['batch_size']
+        sent = 0
+        for event in iter_events(after_id=cursor.revision_id,
+                                 batch_size=batch_size,
+                                 limit=options['limit']):
+            self.stdout.write(to_ndjson(event), ending='')
+            cursor.revision_id = event['id']
+            sent += 1
+            if sent % batch_size == 0:
+                self.stdout.flush()
+                cursor.save(update_fields=['revision_id', 'updated_at'])
+
+        self.stdout.flush()
+        cursor.save(update_fields=['revision_id', 'updated_at'])
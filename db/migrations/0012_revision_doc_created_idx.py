@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0011_auto_20190812_1246'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='revision',
+            index=models.Index(fields=['document', 'created_at'],
+                               name='db_revision_doc_created_idx'),
+        ),
+    ]
@@ -1,11 +1,19 @@
-from django.db import models
+from functools import partial
+
+from django.db import connection, models, router, transaction
+from django.db.models import OuterRef, Q, Subquery
 from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 
 from ipware.ip import get_real_ip
 
+from . import object_cache
+from .diff import IGNORED_FIELDS, invalidate_diffs
+from .fields import ManyToManyField
+from .privacy.choices import privacy_filter
 from .privacy.field import PrivacyField
-from .reputations import get_perms_by_reputation
+from .reputations import get_perms
+from .signals import documents_changed
 
 
 class DocumentID(models.Model):
@@ -25,8 +33,36 @@ class DocumentID(models.Model):
     deleted_at = models.DateTimeField(null=True)
 
     def get_object(self):
-        return self.content_type.model_class().objects_revisions.get(
-            pk=self.revision_tip_id)
+        obj = object_cache.get_revision(
+            self.content_type.model_class().objects_revisions.all(),
+            self.revision_tip_id)
+        # rows are cached by revision, it may not have been the tip then
+        obj.is_tip = True
+        return obj
+
+    def allocate_revision(self):
+        """
+        Takes the next revision index and returns it with the current tip id.
+        The row stays locked until the end of the transaction, so concurrent
+        writers of the same document queue up behind it.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE {table} SET revisions_count = revisions_count + 1 '
+                'WHERE id = %s RETURNING revisions_count, revision_tip_id'
+                .format(table=self._meta.db_table), [self.pk])
+            self.revisions_count, revision_tip_id = cursor.fetchone()
+        return self.revisions_count, revision_tip_id
+
+    def send_changed(self):
+        """
+        Sends `documents_changed`, once the transaction commits, for data
+        derived from the document that changes without a new revision
+        (e.g. vote and comment stats).
+        """
+        transaction.on_commit(partial(
+            documents_changed.send, sender=self.content_type.model_class(),
+            tips={self.pk: None}))
 
     @property
     def revision_tip(self):
@@ -64,15 +100,37 @@ class Revision(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['document', 'created_at'],
+                         name='db_revision_doc_created_idx'),
+        ]
+
     def get_object(self):
         return self.document.content_type.model_class().objects_revisions.get(
             pk=self.pk)
 
-    def save(self, **kwargs):
+    def get_revision_document(self):
+        """
+        DocumentID of the revision itself, it's only allocated when something
+        needs to reference the revision, like votes or comments on it.
+        """
+        using = router.db_for_write(Revision)
         if not self.revision_document_id:
-            self.revision_document_id = DocumentID.objects.create(
-                content_type=ContentType.objects.get_for_model(self)
-            ).id
+            with transaction.atomic(using=using):
+                revision = Revision.objects.using(using).select_for_update(
+                ).get(pk=self.pk)
+                if not revision.revision_document_id:
+                    revision.revision_document_id = DocumentID.objects.using(
+                        using).create(content_type=ContentType.objects.
+                                      get_for_model(self)).id
+                    Revision.objects.using(using).filter(pk=self.pk).update(
+                        revision_document_id=revision.revision_document_id)
+                self.revision_document_id = revision.revision_document_id
+        return DocumentID.objects.using(using).get(
+            pk=self.revision_document_id)
+
+    def save(self, **kwargs):
         if not self.index:
             self.index = Revision.objects.filter(
                 document_id=self.document_id
@@ -80,10 +138,57 @@ class Revision(models.Model):
         return super(Revision, self).save(**kwargs)
 
 
-class TipManager(models.Manager):
+def get_revision_author(request, message=None):
+    author = None
+    ip = None
+    useragent = None
+    if request:
+        if request.user.is_authenticated:
+            author = request.user
+        ip = get_real_ip(request)
+        useragent = request.META.get('HTTP_USER_AGENT')
+        if hasattr(request, 'revisionMessage') and not message:
+            message = request.revisionMessage
+    return author, ip, useragent, message
+
+
+class RevisionManager(models.Manager):
+    def as_of(self, timestamp):
+        """
+        Returns the state each document had at `timestamp` in a single query:
+        for each document of the model, a correlated subquery picks the latest
+        revision created until then from the (document_id, created_at) index
+        of db_revision, and only those rows are read. Reverts are not taken
+        into account, since they don't create revisions.
+        """
+        latest = Revision.objects.filter(
+            document_id=OuterRef('pk'), created_at__lte=timestamp
+        ).order_by('-created_at', '-id').values('pk')[:1]
+        revision_ids = DocumentID.objects.filter(
+            content_type=ContentType.objects.get_for_model(self.model),
+            created_at__lte=timestamp,
+        ).annotate(revision_id=Subquery(latest)).values('revision_id')
+        return self.model._base_manager.filter(
+            pk__in=revision_ids, is_deleted__isnull=True)
+
+
+class TipManager(RevisionManager):
     def get_queryset(self):
+        # the tip of a deleted document is its delete revision, which has
+        # is_deleted set, so there is no need to join db_documentid
         return super(TipManager, self).get_queryset().filter(
-            is_tip=True, document__deleted_at__isnull=True)
+            is_tip=True, is_deleted__isnull=True)
+
+    def get(self, *args, **kwargs):
+        return object_cache.get_tip(self.get_queryset(), *args, **kwargs)
+
+    def visible_to(self, user):
+        """
+        Documents `user` can see given their privacy, friends-only content
+        is checked with a semi-join on db_friendship.
+        """
+        return self.get_queryset().filter(
+            privacy_filter(user, prefix='document__'))
 
 
 class DocumentBase(models.Model):
@@ -96,9 +201,14 @@ class DocumentBase(models.Model):
     # is_deleted field just to store a delete revision
     is_deleted = models.NullBooleanField(null=True)
 
-    objects_revisions = models.Manager()
+    objects_revisions = RevisionManager()
     objects = TipManager()
 
+    # perms granted by reputation, see db.reputations.get_perms
+    REPUTATION_PERMS = {}
+    # large columns deferred by db.optimizer unless requested
+    DEFERRABLE_FIELDS = ()
+
     class Meta:
         abstract = True
         unique_together = ('is_tip', 'document')
@@ -111,12 +221,14 @@ class DocumentBase(models.Model):
     def save(self, request, parent=None, message=None, **kwargs):
         if 'update_fields' in kwargs:
             # does not create a new revion if update_fields present
-            return super(DocumentBase, self).save(**kwargs)
-
-        if not self.document_id:
-            self.document = DocumentID.objects.create(
-                content_type=ContentType.objects.get_for_model(self)
-            )
+            super(DocumentBase, self).save(**kwargs)
+            transaction.on_commit(partial(
+                object_cache.invalidate_revisions, self.__class__, [self.pk]))
+            if set(kwargs['update_fields']) - set(IGNORED_FIELDS):
+                self.send_revision_changed()
+            self.send_documents_changed({
+                self.document_id: self.revision_id if self.is_tip else None})
+            return
 
         parent_id = None
         if self.revision_id and not parent:
@@ -124,16 +236,7 @@ class DocumentBase(models.Model):
         elif parent:
             parent_id = parent.pk
 
-        author = None
-        ip = None
-        useragent = None
-        if request:
-            if request.user.is_authenticated:
-                author = request.user
-            ip = get_real_ip(request)
-            useragent = request.META.get('HTTP_USER_AGENT')
-            if hasattr(request, 'revisionMessage') and not message:
-                message = request.revisionMessage
+        author, ip, useragent, message = get_revision_author(request, message)
 
         revision_type = None
         if not parent_id:
@@ -143,35 +246,162 @@ class DocumentBase(models.Model):
         else:
             revision_type = REVISION_TYPES_CHANGE
 
-        revision = Revision.objects.create(
-            type=revision_type,
-            document=self.document,
-            parent_id=parent_id,
-            author=author.document if author else None,
-            author_ip=ip,
-            author_useragent=useragent,
-            message=message,
-        )
-
-        self.revision = revision
-        self.is_tip = True
-
-        # set other revisions as not tip
-        self.__class__.objects_revisions.filter(
-            document=self.document).update(is_tip=None)
-
-        if revision_type == REVISION_TYPES_CREATE and author:
-            self.document.owner = author.document
-        if not self.document.revision_created_id:
-            self.document.revision_created_id = revision.pk
-        self.document.revision_tip_id = revision.pk
-        self.document.revisions_count = models.F('revisions_count') + 1
-        self.document.save(update_fields=['owner',
-                                          'revision_tip_id',
-                                          'revision_created_id',
-                                          'revisions_count'])
-
-        super(DocumentBase, self).save(**kwargs)
+        with transaction.atomic():
+            if not self.document_id:
+                self.document = DocumentID.objects.create(
+                    content_type=ContentType.objects.get_for_model(self)
+                )
+
+            index, previous_tip_id = self.document.allocate_revision()
+
+            revision = Revision.objects.create(
+                type=revision_type,
+                index=index,
+                document=self.document,
+                parent_id=parent_id,
+                author=author.document if author else None,
+                author_ip=ip,
+                author_useragent=useragent,
+                message=message,
+            )
+
+            self.revision = revision
+            self.is_tip = True
+
+            # set the previous tip as not tip
+            if previous_tip_id:
+                self.__class__.objects_revisions.filter(
+                    pk=previous_tip_id).update(is_tip=None)
+                transaction.on_commit(partial(
+                    object_cache.invalidate_revisions, self.__class__,
+                    [previous_tip_id]))
+
+            if revision_type == REVISION_TYPES_CREATE and author:
+                self.document.owner = author.document
+            if not self.document.revision_created_id:
+                self.document.revision_created_id = revision.pk
+            self.document.revision_tip_id = revision.pk
+            self.document.save(update_fields=['owner',
+                                              'revision_tip_id',
+                                              'revision_created_id'])
+
+            super(DocumentBase, self).save(**kwargs)
+
+            if parent_id:
+                self.__class__.copy_m2m_forward([(parent_id, revision.pk)])
+
+            self.send_documents_changed({self.document_id: revision.pk})
+
+    def send_revision_changed(self):
+        """
+        Drops what is cached about the row of this revision, once the
+        transaction commits, after it was changed in place.
+        """
+        pairs = Revision.objects.filter(
+            Q(pk=self.revision_id) | Q(parent_id=self.revision_id)
+        ).values_list('parent_id', 'pk')
+        transaction.on_commit(partial(invalidate_diffs, list(pairs)))
+
+    @classmethod
+    def send_documents_changed(cls, tips):
+        transaction.on_commit(partial(
+            documents_changed.send, sender=cls, tips=tips))
+
+    @classmethod
+    def copy_m2m_forward(cls, revision_ids):
+        for field in cls._meta.many_to_many:
+            if isinstance(field, ManyToManyField) and field.copy_forward:
+                field.copy_revisions(revision_ids)
+
+    @classmethod
+    def bulk_save(cls, request, objs, message=None):
+        """
+        Saves a new revision of each object in `objs` with a constant number
+        of queries, keeping the same revision semantics as `save`. Each
+        document must appear only once.
+        """
+        objs = list(objs)
+        if not objs:
+            return objs
+
+        author, ip, useragent, message = get_revision_author(request, message)
+        author_document_id = author.document_id if author else None
+
+        with transaction.atomic():
+            created = [obj for obj in objs if not obj.document_id]
+            documents = DocumentID.objects.bulk_create([
+                DocumentID(
+                    content_type=ContentType.objects.get_for_model(cls),
+                    owner_id=author_document_id,
+                ) for obj in created
+            ])
+            for obj, document in zip(created, documents):
+                obj.document = document
+
+            revisions_count = {}
+            previous_tips = []
+            for pk, count, tip_id in DocumentID.objects.select_for_update(
+                ).filter(
+                    pk__in=[obj.document_id for obj in objs if obj.revision_id]
+                    ).values_list('pk', 'revisions_count', 'revision_tip_id'):
+                revisions_count[pk] = count
+                if tip_id:
+                    previous_tips.append(tip_id)
+
+            revisions = []
+            for obj in objs:
+                if not obj.revision_id:
+                    revision_type = REVISION_TYPES_CREATE
+                elif obj.is_deleted:
+                    revision_type = REVISION_TYPES_DELETE
+                else:
+                    revision_type = REVISION_TYPES_CHANGE
+                revisions.append(Revision(
+                    type=revision_type,
+                    index=revisions_count.get(obj.document_id, 0) + 1,
+                    document_id=obj.document_id,
+                    parent_id=obj.revision_id,
+                    author_id=author_document_id,
+                    author_ip=ip,
+                    author_useragent=useragent,
+                    message=message,
+                ))
+            revisions = Revision.objects.bulk_create(revisions)
+
+            # set the previous tips as not tip
+            cls.objects_revisions.filter(
+                pk__in=previous_tips).update(is_tip=None)
+            transaction.on_commit(partial(
+                object_cache.invalidate_revisions, cls, list(previous_tips)))
+
+            copied = []
+            for obj, revision in zip(objs, revisions):
+                if obj.revision_id:
+                    copied.append((obj.revision_id, revision.pk))
+                obj.revision = revision
+                obj.is_tip = True
+            cls.objects_revisions.bulk_create(objs)
+            cls.copy_m2m_forward(copied)
+
+            with connection.cursor() as cursor:
+                cursor.execute('''
+                    UPDATE {table} SET
+                        revision_tip_id = tips.revision_id,
+                        revision_created_id = COALESCE(
+                            {table}.revision_created_id, tips.revision_id),
+                        revisions_count = {table}.revisions_count + 1
+                    FROM (VALUES {values}) AS tips (document_id, revision_id)
+                    WHERE {table}.id = tips.document_id
+                '''.format(
+                    table=DocumentID._meta.db_table,
+                    values=', '.join(['(%s, %s)'] * len(objs)),
+                ), [value for obj in objs
+                    for value in (obj.document_id, obj.revision_id)])
+
+            cls.send_documents_changed({
+                obj.document_id: obj.revision_id for obj in objs})
+
+        return objs
 
     def delete(self, request, **kwargs):
         self.document.deleted_at = timezone.now()
@@ -181,4 +411,42 @@ class DocumentBase(models.Model):
         self.save(request=request, **kwargs)
 
     def get_my_perms(self, user):
-        return get_perms_by_reputation(self, user)
+        return get_perms(self, user,
+                         self.document.revision_created.author_id)
+
+
+class FeedCursor(models.Model):
+    """
+    Last revision id delivered to a consumer of the revision feed.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    revision_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class Friendship(models.Model):
+    """
+    Materialized friend set, each friendship is stored in both directions
+    so `visible_to` only needs an index lookup by user.
+    """
+    user = models.ForeignKey(DocumentID, related_name='friendships',
+                             on_delete=models.CASCADE)
+    friend = models.ForeignKey(DocumentID, related_name='+',
+                               on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'friend')
+
+    @classmethod
+    def befriend(cls, user, friend):
+        with transaction.atomic():
+            cls.objects.get_or_create(user=user, friend=friend)
+            cls.objects.get_or_create(user=friend, friend=user)
+
+    @classmethod
+    def unfriend(cls, user, friend):
+        cls.objects.filter(
+            models.Q(user=user, friend=friend) |
+            models.Q(user=friend, friend=user)
+        ).delete()
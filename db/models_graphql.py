@@ -1,9 +1,14 @@
 import graphene
-from graphene_django import DjangoObjectType, DjangoConnectionField
+from graphene_django import DjangoObjectType
 from graphene.relay import Node
+from graphql_relay.node.node import from_global_id
+from promise import Promise
 
 from accounts.models_graphql import User
 
+from .diff import diff_objects, get_cached_diff, set_cached_diff
+from .graphene import DjangoConnectionField
+from .loaders import get_loaders, load_tip
 from .models import (
     Revision as RevisionModel,
     DocumentID as DocumentIDModel,
@@ -17,6 +22,17 @@ def get_document_type():
     return Document
 
 
+def get_parent_document(global_id):
+    """
+    DocumentID of the parent of votes and comments, the one of a revision
+    is allocated on first use.
+    """
+    gid_type, gid = from_global_id(global_id)
+    if gid_type == 'Revision':
+        return RevisionModel.objects.get(pk=gid).get_revision_document()
+    return DocumentIDModel.objects.get(pk=gid)
+
+
 class RevisionType(graphene.Enum):
     CREATE = REVISION_TYPES_CREATE
     UPDATE = REVISION_TYPES_CHANGE
@@ -27,6 +43,14 @@ class RevisionType(graphene.Enum):
         return dict(REVISION_TYPES)[self._value_]
 
 
+class FieldDiff(graphene.ObjectType):
+    field = graphene.String(required=True)
+    old = graphene.String()
+    new = graphene.String()
+    added = graphene.List(graphene.Int)
+    removed = graphene.List(graphene.Int)
+
+
 class Revision(DjangoObjectType):
     id_int = graphene.Int()
     author = graphene.Field(User)
@@ -37,6 +61,10 @@ class Revision(DjangoObjectType):
     type = graphene.Field(RevisionType)
     typeDisplay = graphene.String()
     is_tip = graphene.Boolean()
+    diff = graphene.List(FieldDiff)
+    # null until something references the revision, read queries never
+    # allocate it (see RevisionModel.get_revision_document)
+    revision_document_id = graphene.Int()
 
     class Meta:
         model = RevisionModel
@@ -46,8 +74,7 @@ class Revision(DjangoObjectType):
         return self.id
 
     def resolve_author(self, info):
-        if self.author_id:
-            return User._meta.model.objects.get(document_id=self.author_id)
+        return load_tip(info, User._meta.model, self.author_id)
 
     def resolve_after(self, info, **kwargs):
         return Revision._meta.model.objects.filter(
@@ -57,15 +84,51 @@ class Revision(DjangoObjectType):
     def resolve_before(self, info):
         return self.parent
 
+    def resolve_document(self, info):
+        return get_loaders(info.context).documents.load(self.document_id)
+
     def resolve_object(self, info):
-        Model = self.document.content_type.model_class()
-        return Model.objects_revisions.get(pk=self.pk)
+        return get_loaders(info.context).revision_object(self)
+
+    def resolve_diff(self, info):
+        changes = get_cached_diff(self.parent_id, self.pk)
+        if changes is not None:
+            return [FieldDiff(**change) for change in changes]
+
+        loaders = get_loaders(info.context)
+        # the parent belongs to the same document, only its id is needed
+        parent = loaders.revision_object(RevisionModel(
+            pk=self.parent_id, document_id=self.document_id)) \
+            if self.parent_id else Promise.resolve(None)
+
+        def get_diff(objs):
+            old, new = objs
+            # the m2m relations of all the revisions are loaded together
+            m2m_values = loaders.m2m_values(new.__class__)
+            return Promise.all([
+                m2m_values.load(old.pk) if old is not None
+                else Promise.resolve({}),
+                m2m_values.load(new.pk),
+            ]).then(lambda values: diff_m2m(old, new, values))
+
+        def diff_m2m(old, new, values):
+            m2m_values = {new.pk: values[1]}
+            if old is not None:
+                m2m_values[old.pk] = values[0]
+            changes = diff_objects(old, new, m2m_values)
+            set_cached_diff(self.parent_id, self.pk, changes)
+            return [FieldDiff(**change) for change in changes]
+
+        return Promise.all([parent, loaders.revision_object(self)]).then(
+            get_diff)
 
     def resolve_typeDisplay(self, info):
         return self.get_type_display()
 
     def resolve_is_tip(self, info):
-        return self.id == self.document.revision_tip_id
+        return get_loaders(info.context).documents.load(
+            self.document_id
+        ).then(lambda document: self.id == document.revision_tip_id)
 
 
 class Document(DjangoObjectType):
@@ -79,14 +142,13 @@ class Document(DjangoObjectType):
 
     def resolve_revision_tip(self, info):
         if self.revision_tip_id:
-            return Revision._meta.model.objects.get(pk=self.revision_tip_id)
+            return get_loaders(info.context).revisions.load(
+                self.revision_tip_id)
 
     def resolve_revision_created(self, info):
         if self.revision_created_id:
-            return Revision._meta.model.objects.get(
-                pk=self.revision_created_id
-            )
+            return get_loaders(info.context).revisions.load(
+                self.revision_created_id)
 
     def resolve_owner(self, info):
-        if self.owner_id:
-            return User._meta.model.objects.get(document_id=self.owner_id)
+        return load_tip(info, User._meta.model, self.owner_id)
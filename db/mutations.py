@@ -4,8 +4,11 @@ from graphql_relay.node.node import from_global_id
 
 from binascii import Error
 
+from django.utils import timezone
+
 from accounts.decorators import login_required
 from backend.mutations import Mutation
+from .archive import restore_revisions
 from .models_graphql import Revision
 
 
@@ -29,16 +32,19 @@ class RevisionRevert(Mutation):
 
         current_obj = document.get_object()
 
-        document.revision_tip_id = revision.pk
-        document.save(update_fields=['revision_tip_id'])
-
         current_obj.is_tip = None
         current_obj.save(update_fields=['is_tip'], request=info.context)
 
+        # an archived revision must be back in the live table to be the tip
+        restore_revisions(current_obj.__class__, [revision.pk])
+
         obj = revision.get_object()
         obj.is_tip = True
-        obj.is_deleted = None
-        obj.save(update_fields=['is_tip', 'is_deleted'], request=info.context)
+        obj.save(update_fields=['is_tip'], request=info.context)
+
+        document.revision_tip_id = revision.pk
+        document.deleted_at = timezone.now() if obj.is_deleted else None
+        document.save(update_fields=['revision_tip_id', 'deleted_at'])
 
         return RevisionRevert(
             node=obj,
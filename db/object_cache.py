@@ -0,0 +1,265 @@
+"""
+Two-tier cache of document rows.
+
+Rows rarely change once their revision is written, so they are kept by
+revision id in a per-process LRU backed by a shared Django cache (the
+OBJECT_CACHE alias), and dropped when a row is saved in place
+(`update_fields` saves). Two small pointer maps sit alongside them:
+document_id -> tip revision id, dropped whenever the document changes
+(`db.signals.documents_changed`), and (field, value) -> document_id for
+`objects.get(<field>=<value>)` lookups, which is verified against the row
+it leads to instead of being invalidated.
+
+Entries live until they are invalidated only with INVALIDATION_BUS, which
+tells the other processes about changes; without it they expire after
+OBJECT_CACHE_TIMEOUT seconds.
+
+Inside transactions the cache is skipped, so writes always start from the
+database state, and pointers are only cached from reads of the primary.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .routers import is_replica
+
+MISSING = object()
+
+
+class LRU(object):
+    def __init__(self, max_size=None):
+        self._max_size = max_size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        # read lazily, settings may not be configured at import time
+        if self._max_size is None:
+            return getattr(settings, 'OBJECT_CACHE_SIZE', 1000)
+        return self._max_size
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.items:
+                return default
+            value, expires = self.items[key]
+            if expires is not None and expires <= time.time():
+                del self.items[key]
+                return default
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        with self.lock:
+            self.items[key] = (
+                value, None if timeout is None else time.time() + timeout)
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+local = LRU()
+
+
+def get_shared():
+    return caches[getattr(settings, 'OBJECT_CACHE', DEFAULT_CACHE_ALIAS)]
+
+
+def object_key(model, revision_id):
+    return 'db:obj:%s:%s' % (model._meta.label_lower, revision_id)
+
+
+def tip_key(document_id):
+    return 'db:tip:%s' % document_id
+
+
+def lookup_key(model, field, value):
+    return 'db:lookup:%s:%s:%s' % (model._meta.label_lower, field.name, value)
+
+
+def get_timeout():
+    """
+    Entries are kept until they are invalidated only when every process
+    hears of the changes, through the invalidation bus (see
+    `db.invalidation`), otherwise other processes could serve stale tip
+    pointers forever, so they expire after OBJECT_CACHE_TIMEOUT.
+    """
+    if getattr(settings, 'INVALIDATION_BUS', False):
+        return None
+    return getattr(settings, 'OBJECT_CACHE_TIMEOUT', 60)
+
+
+def cache_get(key):
+    value = local.get(key, MISSING)
+    if value is MISSING:
+        value = get_shared().get(key, MISSING)
+        if value is not MISSING:
+            local.set(key, value, get_timeout())
+    return None if value is MISSING else value
+
+
+def cache_set(key, value):
+    timeout = get_timeout()
+    local.set(key, value, timeout)
+    get_shared().set(key, value, timeout)
+
+
+def cache_allowed(using=DEFAULT_DB_ALIAS):
+    return not connections[using].in_atomic_block
+
+
+def serialize(obj):
+    return [field.attname for field in obj._meta.concrete_fields], \
+        [getattr(obj, field.attname) for field in obj._meta.concrete_fields]
+
+
+def get_revision_object(model, revision_id):
+    """
+    Row of `model` written by the revision, from the cache.
+    """
+    row = cache_get(object_key(model, revision_id))
+    if row is None:
+        return None
+    return model.from_db(DEFAULT_DB_ALIAS, *row)
+
+
+def set_revision_object(obj):
+    cache_set(object_key(obj.__class__, obj.pk), serialize(obj))
+
+
+def get_tip_object(model, document_id):
+    revision_id = cache_get(tip_key(document_id))
+    if revision_id is None:
+        return None
+    return get_revision_object(model, revision_id)
+
+
+def set_tip_object(obj):
+    set_revision_object(obj)
+    cache_set(tip_key(obj.document_id), obj.pk)
+
+
+def get_lookup(model, args, kwargs):
+    """
+    (field, value) of single field lookups the cache can answer.
+    """
+    if args or len(kwargs) != 1:
+        return None
+    name, value = next(iter(kwargs.items()))
+    if name in ('document', 'document_id', 'document__pk', 'document__id'):
+        return model._meta.get_field('document'), getattr(value, 'pk', value)
+    if name == 'pk' or '__' in name:
+        return None
+    try:
+        field = model._meta.get_field(name)
+    except Exception:
+        return None
+    if field.is_relation or not field.concrete or field.primary_key:
+        return None
+    return field, value
+
+
+def get_tip(queryset, *args, **kwargs):
+    """
+    `queryset.get(*args, **kwargs)` for the tips of a model, answered from
+    the cache for lookups by document or by a single field.
+    """
+    model = queryset.model
+    lookup = get_lookup(model, args, kwargs)
+    if lookup is None or not cache_allowed(queryset.db):
+        return queryset.get(*args, **kwargs)
+
+    field, value = lookup
+    try:
+        value = field.to_python(value) if field.name != 'document' \
+            else int(value)
+    except Exception:
+        return queryset.get(*args, **kwargs)
+
+    if field.name == 'document':
+        document_id = value
+    else:
+        document_id = cache_get(lookup_key(model, field, value))
+
+    if document_id is not None:
+        obj = get_tip_object(model, document_id)
+        if obj is not None and (field.name == 'document' or
+                                getattr(obj, field.attname) == value):
+            return obj
+
+    obj = queryset.get(*args, **kwargs)
+    if is_replica(queryset.db):
+        # a lagging replica could bring back a pointer that was just dropped
+        set_revision_object(obj)
+        return obj
+    set_tip_object(obj)
+    if field.name != 'document':
+        cache_set(lookup_key(model, field, value), obj.document_id)
+    return obj
+
+
+def get_revision(queryset, revision_id):
+    """
+    `queryset.get(pk=revision_id)`, answered from the cache.
+    """
+    if not cache_allowed(queryset.db):
+        return queryset.get(pk=revision_id)
+    obj = get_revision_object(queryset.model, revision_id)
+    if obj is None:
+        obj = queryset.get(pk=revision_id)
+        set_revision_object(obj)
+    return obj
+
+
+def invalidate_keys(keys, shared=True):
+    for key in keys:
+        local.delete(key)
+    if shared:
+        get_shared().delete_many(keys)
+
+
+def invalidate_documents(document_ids, shared=True):
+    invalidate_keys([tip_key(document_id) for document_id in document_ids],
+                    shared=shared)
+
+
+def invalidate_revisions(model, revision_ids, shared=True):
+    """
+    Drops the rows of revisions changed in place.
+    """
+    invalidate_keys([object_key(model, revision_id)
+                     for revision_id in revision_ids], shared=shared)
+
+
+def is_shared():
+    """
+    Whether the OBJECT_CACHE is seen by the other processes, a LocMemCache
+    is not.
+    """
+    return not isinstance(get_shared(), LocMemCache)
+
+
+def documents_changed_receiver(sender, tips, remote=False, **kwargs):
+    # the writer already dropped the shared keys of remote changes, unless
+    # the "shared" cache lives in this process
+    shared = not remote or not is_shared()
+    invalidate_documents(list(tips), shared=shared)
+    if remote:
+        # the tip may have been saved in place by the writer
+        invalidate_revisions(sender, [revision_id for revision_id
+                                      in tips.values() if revision_id],
+                             shared=shared)
@@ -0,0 +1,48 @@
+from django.db.migrations.operations.base import Operation
+
+
+class AddTipIndex(Operation):
+    """
+    Backfills `is_deleted` on the tip rows of a DocumentBase model from
+    `DocumentID.deleted_at` and creates a partial index over the live tips,
+    so `TipManager` doesn't need to join `db_documentid`.
+    """
+    reduces_to_sql = True
+    reversible = True
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def index_name(self, table):
+        return ('%s_tip_idx' % table)[-63:]
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        table = schema_editor.quote_name(model._meta.db_table)
+        schema_editor.execute(
+            'UPDATE %s SET is_deleted = NULL WHERE is_deleted = false' % table)
+        schema_editor.execute(
+            'UPDATE %(table)s SET is_deleted = true FROM db_documentid '
+            'WHERE %(table)s.document_id = db_documentid.id '
+            'AND %(table)s.is_tip AND db_documentid.deleted_at IS NOT NULL' % {
+                'table': table,
+            })
+        schema_editor.execute(
+            'CREATE INDEX %s ON %s (document_id) '
+            'WHERE is_tip AND is_deleted IS NULL' % (
+                schema_editor.quote_name(self.index_name(
+                    model._meta.db_table)),
+                table,
+            ))
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        schema_editor.execute('DROP INDEX IF EXISTS %s' % (
+            schema_editor.quote_name(self.index_name(model._meta.db_table)),
+        ))
+
+    def describe(self):
+        return "Create tip index on %s" % self.model_name
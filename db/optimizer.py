@@ -0,0 +1,103 @@
+"""
+Prepares the querysets of connection fields for the fields requested under
+`edges { node { ... } }`: relations read from each node are joined with
+select_related and the model's DEFERRABLE_FIELDS that were not requested
+are deferred.
+"""
+from django.db.models import QuerySet
+from graphene.utils.str_converters import to_camel_case
+from graphql.language import ast
+
+# fields of the document interfaces that read the node's DocumentID (see
+# `Loaders.document`), and the relations loaded along with it
+DOCUMENT_RELATIONS = {
+    'document': 'document',
+    'revisionCurrent': 'document',
+    'revisionCreated': 'document',
+    'imaging': 'document',
+    'voting': 'document__votestats',
+    'commenting': 'document__commentstats',
+}
+
+
+def collect_fields(info, selection_set, fields=None):
+    if fields is None:
+        fields = {}
+    for selection in selection_set.selections:
+        if isinstance(selection, ast.Field):
+            fields.setdefault(selection.name.value, []).append(selection)
+        elif isinstance(selection, ast.InlineFragment):
+            collect_fields(info, selection.selection_set, fields)
+        elif isinstance(selection, ast.FragmentSpread):
+            fragment = info.fragments.get(selection.name.value)
+            if fragment is not None:
+                collect_fields(info, fragment.selection_set, fields)
+    return fields
+
+
+def get_node_fields(info):
+    """
+    Names of the fields requested for the nodes of the connection being
+    resolved.
+    """
+    fields = {}
+    for field_ast in info.field_asts:
+        if not field_ast.selection_set:
+            continue
+        connection = collect_fields(info, field_ast.selection_set)
+        for edges in connection.get('edges', []):
+            if not edges.selection_set:
+                continue
+            for node in collect_fields(info, edges.selection_set).get('node', []):
+                if node.selection_set:
+                    collect_fields(info, node.selection_set, fields)
+    return set(fields)
+
+
+def has_resolver(node_type, name):
+    types = (node_type, ) + tuple(node_type._meta.interfaces)
+    return any(hasattr(t, 'resolve_%s' % name) for t in types)
+
+
+def get_select_related(model, node_type, names):
+    model_fields = {}
+    for field in model._meta.concrete_fields:
+        model_fields[field.name] = field
+        model_fields[to_camel_case(field.name)] = field
+
+    related = set()
+    for name in names:
+        if name in DOCUMENT_RELATIONS:
+            related.add(DOCUMENT_RELATIONS[name])
+            continue
+        field = model_fields.get(name)
+        if field is None or not field.is_relation:
+            continue
+        if not has_resolver(node_type, field.name):
+            related.add(field.name)
+    return related
+
+
+def get_deferred(model, names):
+    return [name for name in getattr(model, 'DEFERRABLE_FIELDS', ())
+            if name not in names and to_camel_case(name) not in names]
+
+
+def optimize_queryset(queryset, info, node_type):
+    if not isinstance(queryset, QuerySet) or queryset._fields is not None \
+            or queryset.query.combinator:
+        return queryset
+
+    names = get_node_fields(info)
+    if not names:
+        # only totalCount/pageInfo
+        return queryset
+
+    model = queryset.model
+    related = get_select_related(model, node_type, names)
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+    deferred = get_deferred(model, names)
+    if deferred:
+        queryset = queryset.defer(*deferred)
+    return queryset
@@ -0,0 +1,209 @@
+"""
+Keyset pagination for connections over querysets.
+
+Cursors hold the values of the queryset ordering columns (with the pk
+appended as a tie breaker) for the edge, so `after`/`before` become a
+WHERE on those columns instead of an OFFSET, and no COUNT(*) is needed to
+build a page.
+"""
+import datetime
+import decimal
+import json
+import uuid
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+from graphene.relay import PageInfo
+from graphql_relay.utils import base64, unbase64
+
+PREFIX = 'keyset:'
+
+
+class CursorEncoder(json.JSONEncoder):
+    # unlike DjangoJSONEncoder keeps the microseconds of datetimes
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+            return o.isoformat()
+        if isinstance(o, (decimal.Decimal, uuid.UUID)):
+            return str(o)
+        return super(CursorEncoder, self).default(o)
+
+
+def values_to_cursor(values):
+    return base64(PREFIX + json.dumps(values, cls=CursorEncoder))
+
+
+def cursor_to_values(cursor):
+    try:
+        cursor = unbase64(cursor)
+    except Exception:
+        return None
+    if not cursor.startswith(PREFIX):
+        return None
+    try:
+        return json.loads(cursor[len(PREFIX):])
+    except ValueError:
+        return None
+
+
+def is_ordered_by_relation(model, name):
+    """
+    Ordering by a relation name uses the related model's Meta.ordering,
+    which the cursor can't follow.
+    """
+    field = None
+    for part in name.split(LOOKUP_SEP):
+        if field is not None:
+            if not field.is_relation:
+                return False
+            model = field.related_model
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            # annotations
+            return False
+    return field.is_relation and part == field.name and \
+        bool(field.related_model._meta.ordering)
+
+
+def get_ordering(queryset):
+    """
+    (name, descending) pairs ordering the queryset, ending with the pk, or
+    None when the ordering can't be used as a keyset.
+    """
+    query = queryset.query
+    if query.low_mark or query.high_mark is not None or query.combinator \
+            or query.extra_order_by:
+        return None
+
+    if query.order_by:
+        order_by = query.order_by
+    elif query.default_ordering:
+        order_by = query.get_meta().ordering
+    else:
+        order_by = ()
+
+    pk = query.get_meta().pk
+    ordering = []
+    for name in order_by:
+        if not isinstance(name, str) or name == '?':
+            return None
+        descending = name.startswith('-')
+        name = name.lstrip('-+')
+        if name in (pk.name, pk.attname):
+            name = 'pk'
+        elif is_ordered_by_relation(queryset.model, name):
+            return None
+        ordering.append((name, descending))
+        if name == 'pk':
+            break
+
+    if not ordering or ordering[-1][0] != 'pk':
+        ordering.append(('pk', False))
+    return ordering
+
+
+def reverse_ordering(ordering):
+    return [(name, not descending) for name, descending in ordering]
+
+
+def after_value(name, value, descending):
+    # Postgres sorts NULLs last ascending and first descending
+    if value is None:
+        return Q(**{name + '__isnull': False}) if descending else None
+    if descending:
+        return Q(**{name + '__lt': value})
+    return Q(**{name + '__gt': value}) | Q(**{name + '__isnull': True})
+
+
+def keyset_filter(ordering, values):
+    """
+    Rows coming after `values` in `ordering`.
+    """
+    conditions = []
+    equal = Q()
+    for (name, descending), value in zip(ordering, values):
+        after = after_value(name, value, descending)
+        if after is not None:
+            conditions.append(equal & after)
+        if value is None:
+            equal &= Q(**{name + '__isnull': True})
+        else:
+            equal &= Q(**{name: value})
+    if not conditions:
+        return Q(pk__in=[])
+    return reduce(lambda a, b: a | b, conditions)
+
+
+def order_by(queryset, ordering):
+    return queryset.order_by(*[
+        ('-' if descending else '') + name for name, descending in ordering
+    ])
+
+
+def is_keyset_args(args, ordering):
+    for name in ('after', 'before'):
+        cursor = args.get(name)
+        if cursor is None:
+            continue
+        values = cursor_to_values(cursor)
+        if values is None or len(values) != len(ordering):
+            return False
+    return True
+
+
+def resolve_keyset_connection(connection_type, queryset, args, ordering):
+    first = args.get('first')
+    last = args.get('last')
+    after = args.get('after')
+    before = args.get('before')
+
+    keys = ['_keyset_%d' % i for i in range(len(ordering))]
+    rows = queryset.annotate(**{
+        key: F(name) for key, (name, descending) in zip(keys, ordering)
+    })
+    if after is not None:
+        rows = rows.filter(keyset_filter(ordering, cursor_to_values(after)))
+    if before is not None:
+        rows = rows.filter(keyset_filter(reverse_ordering(ordering),
+                                         cursor_to_values(before)))
+
+    has_next_page = has_previous_page = False
+    if last is not None and first is None:
+        rows = list(order_by(rows, reverse_ordering(ordering))[:last + 1])
+        has_previous_page = len(rows) > last
+        rows = rows[:last][::-1]
+    else:
+        rows = order_by(rows, ordering)
+        if first is not None:
+            rows = list(rows[:first + 1])
+            has_next_page = len(rows) > first
+            rows = rows[:first]
+        else:
+            rows = list(rows)
+        if last is not None:
+            has_previous_page = len(rows) > last
+            rows = rows[len(rows) - last:] if last else []
+
+    edges = [
+        connection_type.Edge(
+            node=row,
+            cursor=values_to_cursor([getattr(row, key) for key in keys]),
+        )
+        for row in rows
+    ]
+    connection = connection_type(
+        edges=edges,
+        page_info=PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=has_previous_page,
+            has_next_page=has_next_page,
+        ),
+    )
+    connection.iterable = queryset
+    # counted only if totalCount is requested
+    connection.length = None
+    return connection
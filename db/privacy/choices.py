@@ -7,25 +7,40 @@ PRIVACY_FRIENDS = 2
 PRIVACY_PRIVATE = 3
 
 PRIVACY_DEFAULT = PRIVACY_PUBLIC
+
+
+def friends_of(user):
+    from db.models import Friendship
+    return Friendship.objects.filter(
+        user_id=user.document_id).values('friend_id')
+
+
+# filters take the prefix of the lookups to DocumentID, e.g. 'document__'
 PRIVACY_TYPES = {
     PRIVACY_PUBLIC: {
         'title': _('Publico'),
         'type': 'public',
-        'filter': lambda privacy, user: Q(privacy=privacy)
+        'filter': lambda privacy, user, prefix='': Q(**{
+            prefix + 'privacy': privacy,
+        })
     },
     PRIVACY_FRIENDS: {
         'title': _('Amigos'),
         'type': 'friends',
-        'filter': lambda privacy, user: (
-            Q(privacy=privacy) & (
-                Q(owner__pk__in=user.friends_id) | Q(owner__pk=user.pk)
+        'filter': lambda privacy, user, prefix='': (
+            Q(**{prefix + 'privacy': privacy}) & (
+                Q(**{prefix + 'owner_id__in': friends_of(user)}) |
+                Q(**{prefix + 'owner_id': user.document_id})
             )
         )
     },
     PRIVACY_PRIVATE: {
         'title': _('Privado'),
         'type': 'private',
-        'filter': lambda privacy, user: Q(privacy=privacy, owner=user)
+        'filter': lambda privacy, user, prefix='': Q(**{
+            prefix + 'privacy': privacy,
+            prefix + 'owner_id': user.document_id,
+        })
     }
 }
 
@@ -40,3 +55,11 @@ def choices():
 
 
 PRIVACY_CHOICES = choices()
+
+
+def privacy_filter(user, prefix=''):
+    types = PRIVACY_TYPES if user.is_authenticated else ANONYMOUS_PRIVACY
+    q = Q()
+    for privacy, item in types.items():
+        q |= item['filter'](privacy, user, prefix)
+    return q
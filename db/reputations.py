@@ -1,29 +1,22 @@
-def get_perms_by_reputation(obj, user):
+def get_perms(obj, user, creator_id):
+    """
+    Permissions of `user` over `obj`, created by the user with document id
+    `creator_id`. Besides edit and delete for its creator, each model lists
+    the perms granted by reputation in `REPUTATION_PERMS`, None meaning
+    only for its creator.
+    """
     perms = []
-    has_obj_perms = user.is_authenticated and (user.is_superuser or \
-                    user.document == obj.document.revision_created.author)
-    is_user_rep_gte = lambda user, rep: user.is_authenticated and user.reputation >= rep
+    has_obj_perms = user.is_authenticated and (
+        user.is_superuser or user.document_id == creator_id)
 
     if has_obj_perms:
         perms.append('edit')
         perms.append('delete')
 
-    obj_class_name = obj.__class__.__name__
-
-    if obj_class_name == 'Occurrence':
-        if is_user_rep_gte(user, 10) or has_obj_perms:
-            perms.append('identify')
-
-    if obj_class_name == 'LifeNode':
-        if is_user_rep_gte(user, 4) or has_obj_perms:
-            perms.append('add_image')
-
-    if obj_class_name == 'Post':
-        if has_obj_perms:
-            perms.append('add_image')
-
-    if obj_class_name == 'Page':
-        if has_obj_perms:
-            perms.append('add_image')
+    for perm, reputation in obj.REPUTATION_PERMS.items():
+        if has_obj_perms or (reputation is not None and
+                             user.is_authenticated and
+                             user.reputation >= reputation):
+            perms.append(perm)
 
     return perms
@@ -0,0 +1,196 @@
+"""
+Cache of GraphQL responses to anonymous queries.
+
+Entries are keyed by the sha256 of the query, the operation name and the
+variables, and record the tags they depend on: the DocumentIDs of every
+object whose fields were resolved, the models listed by connections and
+the models of lookups that found nothing, so creating a document
+invalidates the null it used to be.
+Each tag has a token in the cache that is replaced when one of its
+documents changes (see `db.signals.documents_changed`) or when its m2m
+relations are edited in place, entries whose tokens no longer match are
+misses.
+
+The store is any Django cache alias (GRAPHQL_RESPONSE_CACHE), so it can be
+the in-process locmem LRU, a file based cache or memcached.
+"""
+import hashlib
+import json
+import uuid
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models, transaction
+from graphql.type.definition import get_named_type
+from graphql_relay.node.node import from_global_id
+from promise import Promise
+
+from .models import DocumentID
+
+
+def document_tag(document_id):
+    return 'doc:%s' % document_id
+
+
+def model_tag(model):
+    return 'model:%s' % model._meta.label_lower
+
+
+def tag_key(tag):
+    return 'graphql:tag:%s' % tag
+
+
+def response_key(query_hash, operation_name, variables):
+    variables = json.dumps(variables or {}, sort_keys=True, default=str)
+    digest = hashlib.sha256(('%s:%s' % (operation_name or '', variables)
+                             ).encode('utf-8')).hexdigest()
+    return 'graphql:response:%s:%s' % (query_hash, digest)
+
+
+class ResponseCache(object):
+    def __init__(self, alias, timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get_tokens(self, tags, create=False):
+        keys = {tag_key(tag): tag for tag in tags}
+        tokens = {keys[key]: token
+                  for key, token in self.cache.get_many(list(keys)).items()}
+        if create:
+            for tag in set(tags) - set(tokens):
+                token = uuid.uuid4().hex
+                if not self.cache.add(tag_key(tag), token, None):
+                    token = self.cache.get(tag_key(tag))
+                tokens[tag] = token
+        return tokens
+
+    def get(self, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        tokens = entry['tokens']
+        if self.get_tokens(tokens) != tokens:
+            return None
+        return entry['response']
+
+    def set(self, key, response, tags):
+        self.cache.set(key, {
+            'response': response,
+            'tokens': self.get_tokens(tags, create=True),
+        }, self.timeout)
+
+    def invalidate(self, tags):
+        self.cache.set_many({
+            tag_key(tag): uuid.uuid4().hex for tag in tags
+        }, None)
+
+
+def get_response_cache():
+    if not settings.GRAPHQL_RESPONSE_CACHE:
+        return None
+    return ResponseCache(settings.GRAPHQL_RESPONSE_CACHE,
+                         settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT)
+
+
+def documents_changed_receiver(sender, tips, **kwargs):
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        response_cache.invalidate(
+            [document_tag(document_id) for document_id in tips] +
+            [model_tag(sender)])
+
+
+def get_document_ids(model, pks):
+    if not pks:
+        return []
+    if issubclass(model, DocumentID):
+        return list(pks)
+    try:
+        model._meta.get_field('document')
+    except FieldDoesNotExist:
+        return []
+    return list(model._base_manager.filter(pk__in=pks).values_list(
+        'document_id', flat=True))
+
+
+def m2m_changed_receiver(sender, instance, action, model, pk_set, **kwargs):
+    """
+    m2m edits made in place, without a new revision (e.g. adding a common
+    name to a life node), invalidate both sides once committed.
+    """
+    if not action.startswith('post_'):
+        return
+    response_cache = get_response_cache()
+    if response_cache is None:
+        return
+    document_ids = get_document_ids(type(instance), [instance.pk]) + \
+        get_document_ids(model, pk_set)
+    tags = [document_tag(document_id) for document_id in document_ids] + \
+        [model_tag(type(instance)), model_tag(model)]
+    transaction.on_commit(partial(response_cache.invalidate, tags))
+
+
+def get_graphene_model(graphql_type):
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    return getattr(getattr(graphene_type, '_meta', None), 'model', None)
+
+
+def get_lookup_models(info, args):
+    """
+    Models a field resolving to null was looking for: the model of its
+    type, or of the types in its global `id`/`ids` arguments for
+    interfaces like `node`.
+    """
+    model = get_graphene_model(get_named_type(info.return_type))
+    if model is not None:
+        return [model]
+
+    ids = args.get('ids') or [args.get('id')]
+    found = []
+    for global_id in ids:
+        try:
+            type_name, _id = from_global_id(global_id)
+            model = get_graphene_model(info.schema.get_type(type_name))
+        except Exception:
+            continue
+        if model is not None:
+            found.append(model)
+    return found
+
+
+class ResponseCacheMiddleware(object):
+    """
+    Records the tags of the objects and connections resolved while
+    `request.graphql_cache_tags` is set.
+    """
+    def resolve(self, next, root, info, **args):
+        tags = getattr(info.context, 'graphql_cache_tags', None)
+        if tags is None:
+            return next(root, info, **args)
+
+        if isinstance(root, DocumentID):
+            tags.add(document_tag(root.pk))
+        elif isinstance(root, models.Model) and \
+                getattr(root, 'document_id', None):
+            tags.add(document_tag(root.document_id))
+
+        def record(result):
+            iterable = getattr(result, 'iterable', None)
+            if isinstance(iterable, models.QuerySet):
+                tags.add(model_tag(iterable.model))
+            elif result is None or (isinstance(result, list) and
+                                    None in result):
+                tags.update(model_tag(model)
+                            for model in get_lookup_models(info, args))
+            return result
+
+        result = next(root, info, **args)
+        if Promise.is_thenable(result):
+            return Promise.resolve(result).then(record)
+        return record(result)
@@ -0,0 +1,85 @@
+"""
+Read replicas.
+
+Writes always go to the primary (`default`). Reads go to one of the
+DATABASE_REPLICAS inside `use_replica()`, which the GraphQL view enters for
+query operations, unless the session wrote recently: `pin_primary` keeps a
+session on the primary for REPLICA_PIN_SECONDS after each mutation so
+users read their own revisions. Heavy aggregates (counts, clusters) use
+`aggregate_db()`, a replica whenever the session isn't pinned, even outside
+`use_replica()`, as they tolerate the replication lag. Whatever fills a
+shared cache is read from the primary, or the cache could keep the lag past
+its invalidation.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_SESSION_KEY = 'db_primary_until'
+
+state = threading.local()
+
+
+def get_replica():
+    if not settings.DATABASE_REPLICAS:
+        return DEFAULT_DB_ALIAS
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def is_replica(alias):
+    return alias in settings.DATABASE_REPLICAS
+
+
+@contextmanager
+def use_replica(enabled=True):
+    """
+    Reads from a replica, or from the primary, aggregates included, when
+    not `enabled`.
+    """
+    previous = (getattr(state, 'replica', None),
+                getattr(state, 'primary', False))
+    state.replica = get_replica() if enabled else None
+    state.primary = not enabled
+    try:
+        yield state.replica
+    finally:
+        state.replica, state.primary = previous
+
+
+def aggregate_db():
+    # inside a transaction on the primary its own writes must be counted
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block or \
+            getattr(state, 'primary', False):
+        return DEFAULT_DB_ALIAS
+    return getattr(state, 'replica', None) or get_replica()
+
+
+def pin_primary(request):
+    session = getattr(request, 'session', None)
+    if session is not None and settings.DATABASE_REPLICAS:
+        session[PIN_SESSION_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
+
+
+def is_pinned(request):
+    session = getattr(request, 'session', None)
+    if session is None:
+        return False
+    return session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+class ReplicaRouter(object):
+    def db_for_read(self, model, **hints):
+        return getattr(state, 'replica', None)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
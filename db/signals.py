@@ -0,0 +1,8 @@
+from django.dispatch import Signal
+
+# sent, once the transaction commits, with the model class as sender when
+# documents get a new tip; `tips` maps each document_id to its new tip
+# revision id, or None when it isn't known (e.g. `update_fields` saves).
+# `remote` is True when it is relayed from another process by
+# `db.invalidation`
+documents_changed = Signal(providing_args=['tips', 'remote'])
@@ -6,6 +6,9 @@ from graphene.types.datetime import DateTime
 from graphene.relay import GlobalID, Node
 from graphql.language import ast
 
+from .loaders import get_loaders
+from .reputations import get_perms
+
 
 class MyGlobalID(GlobalID):
     @staticmethod
@@ -36,7 +39,10 @@ class DocumentBase(graphene.AbstractType):
         return cls._meta.model.objects.get(document_id=id)
 
     def resolve_my_perms(self, info):
-        return self.get_my_perms(info.context.user)
+        user = info.context.user
+        return get_loaders(info.context).creators.load(
+            self.document_id
+        ).then(lambda creator_id: get_perms(self, user, creator_id))
 
 
 class DateTimeField(DateTime):
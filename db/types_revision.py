@@ -1,6 +1,7 @@
 import graphene
-from graphene_django import DjangoConnectionField
 
+from .graphene import DjangoConnectionField
+from .loaders import get_loaders
 from .models_graphql import Revision, Document
 from .types import DocumentBase
 
@@ -12,18 +13,25 @@ class DocumentNode(DocumentBase, graphene.Interface):
     revisions = DjangoConnectionField(Revision)
 
     def resolve_document(self, info):
-        if self.document_id:
-            return Document._meta.model.objects.get(pk=self.document_id)
+        return get_loaders(info.context).document(self)
 
     def resolve_revision_current(self, info):
-        if self.document.revision_tip_id:
-            return Revision._meta.model.objects.get(
-                pk=self.document.revision_tip_id)
+        loaders = get_loaders(info.context)
+
+        def get_revision(document):
+            if document.revision_tip_id:
+                return loaders.revisions.load(document.revision_tip_id)
+
+        return loaders.document(self).then(get_revision)
 
     def resolve_revision_created(self, info):
-        if self.document.revision_created_id:
-            return Revision._meta.model.objects.get(
-                pk=self.document.revision_created_id)
+        loaders = get_loaders(info.context)
+
+        def get_revision(document):
+            if document.revision_created_id:
+                return loaders.revisions.load(document.revision_created_id)
+
+        return loaders.document(self).then(get_revision)
 
     def resolve_revisions(self, info, **kwargs):
         return Revision._meta.model.objects.filter(
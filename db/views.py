@@ -1,3 +1,25 @@
-from django.shortcuts import render
+from django.http import StreamingHttpResponse, HttpResponseBadRequest
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+from .feed import iter_events, to_ndjson
+from .privacy.choices import PRIVACY_PUBLIC
+
+
+@require_GET
+def revision_feed(request):
+    """
+    Streams revision events of public documents as NDJSON, resume with
+    `after` set to the id of the last event received.
+    """
+    try:
+        after_id = int(request.GET.get('after', 0))
+        limit = request.GET.get('limit')
+        limit = int(limit) if limit else None
+    except ValueError:
+        return HttpResponseBadRequest('after and limit must be integers')
+
+    events = iter_events(after_id=after_id, limit=limit,
+                         privacy=PRIVACY_PUBLIC)
+    return StreamingHttpResponse(
+        (to_ndjson(event) for event in events),
+        content_type='application/x-ndjson')
@@ -1,10 +1,11 @@
 import graphene
 from graphene.relay import Node
-from graphene_django import DjangoConnectionField, DjangoObjectType
+from graphene_django import DjangoObjectType
 
 from db.models import DocumentID
 from db.types_revision import DocumentNode, DocumentBase
-from db.graphene import CountedConnection
+from db.graphene import CountedConnection, DjangoConnectionField
+from db.loaders import get_loaders
 
 from .models import (
     Image as ImageModel,
@@ -44,9 +45,11 @@ class ImagesNode(graphene.Interface):
     imaging = graphene.Field(Imaging)
 
     def resolve_imaging(self, info):
-        c = Imaging(id=self.document.pk)
-        c._document = self.document
-        return c
+        def imaging(document):
+            c = Imaging(id=document.pk)
+            c._document = document
+            return c
+        return get_loaders(info.context).document(self).then(imaging)
 
 
 class Image(DjangoObjectType, DocumentBase):
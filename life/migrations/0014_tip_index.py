@@ -0,0 +1,17 @@
+from django.db import migrations
+
+from db.operations import AddTipIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0011_auto_20190812_1246'),
+        ('life', '0013_auto_20191003_0141'),
+    ]
+
+    operations = [
+        AddTipIndex('lifenode'),
+        AddTipIndex('commonname'),
+        AddTipIndex('characteristic'),
+    ]
@@ -79,6 +79,9 @@ class LifeNode(DocumentBase):
         related_name='lifeNode_image'
     )
 
+    REPUTATION_PERMS = {'add_image': 4}
+    DEFERRABLE_FIELDS = ('description', )
+
     # class Meta:
     #     unique_together = ("is_tip", "slug")
 
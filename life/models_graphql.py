@@ -1,13 +1,16 @@
 import graphene
 import django_filters
+from promise import Promise
 from graphene.relay import Node
-from graphene_django import DjangoObjectType, DjangoConnectionField
-from graphene_django.filter import DjangoFilterConnectionField
+from graphene_django import DjangoObjectType
 from django.contrib.auth.hashers import make_password
 from random import shuffle
 
 from db.types_revision import DocumentNode, DocumentBase
-from db.graphene import CountedConnection
+from db.graphene import (
+    CountedConnection, DjangoConnectionField, DjangoFilterConnectionField
+)
+from db.loaders import get_loaders, load_object
 
 from .models import (
     RANK_CHOICES, RANK_GENUS, RANK_SPECIES,
@@ -145,18 +148,19 @@ class LifeNode(DjangoObjectType, DocumentBase):
         return cls._meta.model.objects.get(document_id=id)
 
     def resolve_parent(self, info):
-        if self.parent:
-            return self.parent.get_object()
+        return load_object(info, self.parent_id)
 
     def resolve_parents(self, info):
-        def get_parents(obj):
-            parents = []
-            if obj.parent:
-                parent = obj.parent.get_object()
-                parents.append(parent)
-                parents.extend(get_parents(parent))
-            return parents
-        return get_parents(self)
+        loaders = get_loaders(info.context)
+
+        def get_parents(obj, parents):
+            if not obj or not obj.parent_id:
+                return parents
+            return loaders.object(obj.parent_id).then(
+                lambda parent: get_parents(parent, parents + [parent])
+                if parent else parents
+            )
+        return Promise.resolve(get_parents(self, []))
 
     def resolve_rankDisplay(self, info):
         return self.get_rank_display()
@@ -240,10 +244,11 @@ class Characteristic(DjangoObjectType, DocumentBase):
         connection_class = CountedConnection
 
     def resolve_tag(self, info):
-        return self._get_tag()
+        return load_object(info, self.tag_id)
 
     def resolve_title(self, info):
-        return self._get_tag().title
+        return load_object(info, self.tag_id).then(
+            lambda tag: tag.title if tag else None)
 
 
 class Quizz(graphene.ObjectType):
@@ -41,23 +41,8 @@ def node_save(node, args, info):
         gid_type, gid = from_global_id(parent_id)
         node.parent = Document._meta.model.objects.get(pk=gid)
 
-    prev_images = []
-    if node.pk:
-        prev_images = node.images.values_list('id', flat=True)
-
-    prev_commonNames = []
-    if node.pk:
-        prev_commonNames = node.commonNames.values_list('id', flat=True)
-
     node.save(request=info.context)
 
-    for prev_img_id in prev_images:
-        node.images.add(prev_img_id)
-
-    node.commonNames.clear()
-    for prev_name_id in prev_commonNames:
-        node.commonNames.add(prev_name_id)
-
     commonNames = args.get('commonNames', [])
     for commonNameDict in commonNames:
         commonName_id = commonNameDict.get('id', '').strip(' \t\n\r')
@@ -84,8 +69,7 @@ def node_save(node, args, info):
         commonName.name = commonName_str
         commonName.language = commonNameDict['language']
         commonName.save(request=info.context)
-        if commonName.document_id not in prev_commonNames:
-            node.commonNames.add(commonName.document)
+        node.commonNames.add(commonName.document)
 
     imagesToAdd = args.get('imagesToAdd', [])
     for imageToAdd in imagesToAdd:
@@ -1,5 +1,7 @@
 from backend.tests import UserTestCase
+from django.db import connection
 from django.test.client import MULTIPART_CONTENT
+from django.test.utils import CaptureQueriesContext
 from graphql_relay.node.node import to_global_id
 
 from .factories import LifeNodeFactory
@@ -358,3 +360,117 @@ class LifeNodeTest(UserTestCase):
             }
         }
         self.assertEqual(response.json(), expected)
+
+    def test_list_query_count(self):
+        self._do_login()
+        for i in range(6):
+            parent = LifeNodeFactory()
+            LifeNodeFactory(parent=parent.document)
+
+        def count_queries(first):
+            return len(self.capture_list_queries('allLifeNode', '''
+                title
+                myPerms
+                parent { title }
+                revisionCreated { author { username } }
+            ''', first))
+
+        # parents, authors and perms are batched, so the number of queries
+        # must not grow with the page size
+        self.assertEqual(count_queries(2), count_queries(6))
+
+    def test_list_optimizer(self):
+        for i in range(4):
+            LifeNodeFactory()
+
+        def count_queries(first):
+            return self.capture_list_queries('allLifeNode', '''
+                title
+                voting { count }
+                commenting { count }
+            ''', first)
+
+        queries = count_queries(2)
+        self.assertEqual(len(queries), len(count_queries(4)))
+        # description was not requested
+        self.assertFalse(any('"description"' in query['sql']
+                             for query in queries))
+
+    def test_keyset_pagination(self):
+        for i in range(5):
+            LifeNodeFactory()
+
+        def page(**variables):
+            response = self.graphql({
+                'query': '''
+                    query Q($first: Int, $last: Int,
+                            $after: String, $before: String) {
+                        allLifeNode(first: $first, last: $last,
+                                    after: $after, before: $before) {
+                            totalCount
+                            pageInfo {
+                                hasNextPage
+                                hasPreviousPage
+                                startCursor
+                                endCursor
+                            }
+                            edges {
+                                node {
+                                    title
+                                }
+                            }
+                        }
+                    }
+                    ''',
+                'variables': variables,
+            })
+            return response.json()['data']['allLifeNode']
+
+        titles = [edge['node']['title']
+                  for edge in page(first=10)['edges']]
+        self.assertEqual(len(titles), 5)
+
+        seen = []
+        after = None
+        while True:
+            result = page(first=2, after=after)
+            self.assertEqual(result['totalCount'], 5)
+            seen += [edge['node']['title'] for edge in result['edges']]
+            if not result['pageInfo']['hasNextPage']:
+                break
+            after = result['pageInfo']['endCursor']
+        self.assertEqual(seen, titles)
+
+        result = page(last=2, before=after)
+        self.assertEqual([edge['node']['title'] for edge in result['edges']],
+                         titles[1:3])
+        self.assertTrue(result['pageInfo']['hasPreviousPage'])
+
+    def test_nodes(self):
+        nodes = [LifeNodeFactory() for i in range(3)]
+        ids = [to_global_id('LifeNode', node.document_id)
+               for node in reversed(nodes)]
+        ids.insert(1, to_global_id('LifeNode', 0))
+        ids.append('invalid')
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.graphql({
+                'query': '''
+                    query Q($ids: [ID!]!) {
+                        nodes(ids: $ids) {
+                            id
+                            ... on LifeNode {
+                                title
+                            }
+                        }
+                    }
+                    ''',
+                'variables': {
+                    'ids': ids,
+                },
+            })
+        self.assertEqual(len(ctx.captured_queries), 1)
+        result = response.json()['data']['nodes']
+        self.assertEqual(
+            [node and node['title'] for node in result],
+            [nodes[2].title, None, nodes[1].title, nodes[0].title, None])
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+from db.operations import AddTipIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0011_auto_20190812_1246'),
+        ('lists', '0008_populate_liststats_for_plants'),
+    ]
+
+    operations = [
+        AddTipIndex('list'),
+        AddTipIndex('collectionitem'),
+        AddTipIndex('wishitem'),
+    ]
@@ -1,10 +1,11 @@
 import graphene
+from promise import Promise
 from graphene_django import DjangoObjectType
 from graphene.relay import Node
 
-from db.models import DocumentID
 from db.types_revision import DocumentNode, DocumentBase
 from db.graphene import CountedConnection
+from db.loaders import load_object, load_tip
 
 from .models import List as ListModel, CollectionItem as CollectionItemModel, WishItem as WishItemModel
 from commenting.models_graphql import CommentsNode
@@ -29,14 +30,15 @@ class List(DjangoObjectType, DocumentBase):
         if not self.items:
             return []
 
-        items = []
-        for item in self.items:
-            items.append(ListItem(
-                id=item['id'],
-                item=DocumentID.objects.get(id=item['item_id']).get_object(),
-                notes=item['notes']
-            ))
-        return items
+        def list_item(item):
+            return load_object(info, item['item_id']).then(
+                lambda obj: ListItem(
+                    id=item['id'],
+                    item=obj,
+                    notes=item['notes']
+                )
+            )
+        return Promise.all([list_item(item) for item in self.items])
 
 
 class ListItem(graphene.ObjectType):
@@ -55,14 +57,11 @@ class CollectionItem(DjangoObjectType, DocumentBase):
         connection_class = CountedConnection
 
     def resolve_plant(self, info):
-        if not self.plant_id:
-            return None
-        return LifeNode._meta.model.objects.get(document_id=self.plant_id)
+        return load_tip(info, LifeNode._meta.model, self.plant_id)
 
     def resolve_user(self, info):
-        if self.user_id:
-            User = get_user_type()
-            return User._meta.model.objects.get(document_id=self.user_id)
+        User = get_user_type()
+        return load_tip(info, User._meta.model, self.user_id)
 
 
 class WishItem(DjangoObjectType, DocumentBase):
@@ -75,11 +74,8 @@ class WishItem(DjangoObjectType, DocumentBase):
         connection_class = CountedConnection
 
     def resolve_plant(self, info):
-        if not self.plant_id:
-            return None
-        return LifeNode._meta.model.objects.get(document_id=self.plant_id)
+        return load_tip(info, LifeNode._meta.model, self.plant_id)
 
     def resolve_user(self, info):
-        if self.user_id:
-            User = get_user_type()
-            return User._meta.model.objects.get(document_id=self.user_id)
+        User = get_user_type()
+        return load_tip(info, User._meta.model, self.user_id)
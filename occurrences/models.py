@@ -41,6 +41,8 @@ class Occurrence(DocumentBase):
     is_request = models.BooleanField(default=False)
 
     REPUTATION_VALUE = 1
+    REPUTATION_PERMS = {'identify': 10}
+    DEFERRABLE_FIELDS = ('location_extra', )
 
 
 class Suggestion(DocumentBase):
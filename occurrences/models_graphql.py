@@ -4,11 +4,12 @@ import graphql_geojson
 from decimal import Decimal
 from django.contrib.gis.geos import Polygon
 from graphene.relay import Node
-from graphene_django import DjangoConnectionField, DjangoObjectType
+from graphene_django import DjangoObjectType
 from graphene_django.converter import convert_django_field
 
 from db.types_revision import DocumentNode, DocumentBase
-from db.graphene import CountedConnection
+from db.graphene import CountedConnection, DjangoConnectionField
+from db.loaders import load_tip
 
 from .models import (
     Occurrence as OccurrenceModel,
@@ -46,12 +47,10 @@ class Occurrence(DjangoObjectType, DocumentBase):
         return cls._meta.model.objects.get(document_id=id)
 
     def resolve_author(self, info):
-        return User._meta.model.objects.get(document_id=self.author_id)
+        return load_tip(info, User._meta.model, self.author_id)
 
     def resolve_identity(self, info):
-        if not self.identity_id:
-            return None
-        return LifeNode._meta.model.objects.get(document_id=self.identity_id)
+        return load_tip(info, LifeNode._meta.model, self.identity_id)
 
     def resolve_images(self, info, **kwargs):
         return Image._meta.model.objects.filter(
@@ -100,12 +99,10 @@ class SuggestionID(DjangoObjectType, DocumentBase):
         connection_class = CountedConnection
 
     def resolve_author(self, info):
-        return User._meta.model.objects.get(document_id=self.author_id)
+        return load_tip(info, User._meta.model, self.author_id)
 
     def resolve_occurrence(self, info):
-        return Occurrence._meta.model.objects.get(
-            document_id=self.occurrence_id)
+        return load_tip(info, Occurrence._meta.model, self.occurrence_id)
 
     def resolve_identity(self, info):
-        return LifeNode._meta.model.objects.get(
-            document_id=self.identity_id)
+        return load_tip(info, LifeNode._meta.model, self.identity_id)
@@ -169,10 +169,6 @@ class WhatIsThisIdentify(Mutation):
         gid_type, gid = from_global_id(input.get('id'))
         occurrence = Occurrence._meta.model.objects.get(document_id=gid)
 
-        prev_images = []
-        if occurrence.pk:
-            prev_images = occurrence.images.values_list('id', flat=True)
-
         error = has_permission(cls, info.context, occurrence, 'identify')
         if error:
             return error
@@ -184,9 +180,6 @@ class WhatIsThisIdentify(Mutation):
 
         occurrence.save(request=info.context, message="define identificação")
 
-        for prev_img_id in prev_images:
-            occurrence.images.add(prev_img_id)
-
         return WhatIsThisIdentify(occurrence=occurrence)
 
 
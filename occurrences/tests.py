@@ -1,5 +1,8 @@
 from backend.tests import UserTestCase
+from django.contrib.gis.geos import Point
 from django.test.client import MULTIPART_CONTENT
+
+from life.tests.factories import LifeNodeFactory
 from .models import Occurrence
 
 
@@ -318,3 +321,28 @@ class OccurrenceTest(UserTestCase):
                 }
             }
         }, client=client)
+
+    def test_list_query_count(self):
+        for i in range(6):
+            for is_request in (False, True):
+                Occurrence(
+                    author=self.user.document,
+                    identity=LifeNodeFactory().document,
+                    location=Point(-43.96, -19.85),
+                    is_request=is_request,
+                ).save(request=None)
+
+        def count_queries(field, first):
+            return len(self.capture_list_queries(field, '''
+                notes
+                author { username }
+                identity { title }
+                revisionCreated { author { username } }
+                voting { count }
+                commenting { count }
+            ''', first))
+
+        # authors, identities and stats are batched, so the number of
+        # queries must not grow with the page size
+        for field in ('allOccurrences', 'allWhatIsThis'):
+            self.assertEqual(count_queries(field, 2), count_queries(field, 6))
@@ -20,6 +20,7 @@ class Page(DocumentBase):
     published_at = models.DateTimeField(null=True)
 
     REPUTATION_VALUE = 2
+    REPUTATION_PERMS = {'add_image': None}
 
     class Meta:
         unique_together = ("is_tip", "url")
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+from db.operations import AddTipIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0011_auto_20190812_1246'),
+        ('posts', '0005_auto_20201018_1846'),
+    ]
+
+    operations = [
+        AddTipIndex('post'),
+    ]
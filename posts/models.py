@@ -46,6 +46,8 @@ class Post(DocumentBase):
     )
 
     REPUTATION_VALUE = 2
+    REPUTATION_PERMS = {'add_image': None}
+    DEFERRABLE_FIELDS = ('body', )
 
     class Meta:
         unique_together = ("is_tip", "url")
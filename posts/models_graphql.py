@@ -1,9 +1,10 @@
 import graphene
-from graphene_django import DjangoConnectionField, DjangoObjectType
+from graphene_django import DjangoObjectType
 from graphene.relay import Node
 
 from db.types_revision import DocumentNode, DocumentBase
-from db.graphene import CountedConnection
+from db.graphene import CountedConnection, DjangoConnectionField
+from db.loaders import load_object
 
 from .models import Post as PostModel
 from commenting.models_graphql import CommentsNode
@@ -37,5 +38,4 @@ class Post(DjangoObjectType, DocumentBase):
         ).order_by('revision')
 
     def resolve_main_image(self, info, **kwargs):
-        if self.main_image:
-            return self.main_image.get_object()
+        return load_object(info, self.main_image_id)
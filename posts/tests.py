@@ -1,6 +1,8 @@
 from backend.tests import UserTestCase
 from backend.fields import LoginRequiredError
 
+from .models import Post
+
 
 class PostsTest(UserTestCase):
     def _do_create_page(self, client, post):
@@ -110,3 +112,19 @@ class PostsTest(UserTestCase):
             }
         }
         self.assertEqual(response.json(), expected)
+
+    def test_list_query_count(self):
+        for i in range(6):
+            Post(title='Post %d' % i, url='post-%d' % i,
+                 body='body').save(request=None)
+
+        def count_queries(first):
+            return len(self.capture_list_queries('allPosts', '''
+                title
+                mainImage { id }
+                revisionCreated { author { username } }
+                voting { count }
+                commenting { count }
+            ''', first))
+
+        self.assertEqual(count_queries(2), count_queries(6))
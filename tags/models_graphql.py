@@ -1,8 +1,8 @@
-from graphene_django import DjangoObjectType, DjangoConnectionField
+from graphene_django import DjangoObjectType
 from graphene.relay import Node
 
 from db.types_revision import DocumentNode, DocumentBase
-from db.graphene import CountedConnection
+from db.graphene import CountedConnection, DjangoConnectionField
 
 from .models import Tag as TagModel
 
@@ -0,0 +1,16 @@
+from django.db import migrations
+
+from db.operations import AddTipIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0011_auto_20190812_1246'),
+        ('tests', '0001_initial'),
+    ]
+
+    operations = [
+        AddTipIndex('tag'),
+        AddTipIndex('page'),
+    ]
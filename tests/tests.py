@@ -1,8 +1,75 @@
+import os
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.cache import caches
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from db.archive import (
+    archive_revisions, create_archive, has_archive, restore_revisions
+)
+from db.counting import (
+    CACHED, ESTIMATED, EXACT, count_queryset, invalidate_counts
+)
+from db import object_cache
+from db.invalidation import (
+    Listener, coalesce, get_payloads, publish, start_listener
+)
+from db.diff import get_m2m_values, get_revision_diff
+from db.feed import iter_events
+from db.models import DocumentID, Friendship, Revision
+from db.routers import (
+    ReplicaRouter, aggregate_db, is_pinned, pin_primary, use_replica
+)
+from db.privacy.choices import (
+    PRIVACY_FRIENDS, PRIVACY_PRIVATE, PRIVACY_PUBLIC
+)
 from tests.models import Page, Tag
+from voting.models import Vote
 from backend.tests import UserTestCase
 
 
 class RevisionsTest(UserTestCase):
+    def test_revision_document(self):
+        tag = Tag(title='Tag', slug='tag')
+        tag.save(request=None)
+        revision = Revision.objects.get(pk=tag.revision_id)
+        self.assertIsNone(revision.revision_document_id)
+
+        document = revision.get_revision_document()
+        self.assertEqual(Revision.objects.get(
+            pk=revision.pk).revision_document_id, document.pk)
+        # allocated only once
+        self.assertEqual(Revision.objects.get(
+            pk=revision.pk).get_revision_document(), document)
+
+    def test_reclaim_revision_documents(self):
+        tag = Tag(title='Tag', slug='tag')
+        tag.save(request=None)
+        tag.title = 'Tag updated'
+        tag.save(request=None)
+        unused, voted = Revision.objects.filter(
+            document_id=tag.document_id).order_by('id')
+        unused_document = unused.get_revision_document()
+        voted_document = voted.get_revision_document()
+        Vote(parent=voted_document, author=self.user.document,
+             value=1).save(request=None)
+
+        call_command('reclaim_revision_documents', stdout=StringIO())
+        self.assertFalse(DocumentID.objects.filter(
+            pk=unused_document.pk).exists())
+        self.assertIsNone(
+            Revision.objects.get(pk=unused.pk).revision_document_id)
+        self.assertTrue(DocumentID.objects.filter(
+            pk=voted_document.pk).exists())
+        self.assertEqual(voted_document.votes.count(), 1)
+
     def test_create_page(self):
         tag_1 = Tag(title='Tag 1', slug="tag-1")
         tag_1.save(request=None)
@@ -82,3 +149,445 @@ class RevisionsTest(UserTestCase):
         reverted_page.delete(request=None)
         self.assertEqual(0, Page.objects.all().count())
         self.assertEqual(0, tag_1.pages.count())
+
+    def _bulk_save_queries(self, count):
+        tags = [Tag(title='Tag %d' % i, slug='tag-%d' % i)
+                for i in range(count)]
+        with CaptureQueriesContext(connection) as ctx:
+            Tag.bulk_save(None, tags)
+        return tags, len(ctx.captured_queries)
+
+    def test_bulk_save(self):
+        tags, queries = self._bulk_save_queries(2)
+        self.assertEqual(2, Tag.objects.count())
+
+        more_tags, more_queries = self._bulk_save_queries(10)
+        self.assertEqual(12, Tag.objects.count())
+        self.assertEqual(queries, more_queries)
+
+        for tag in tags:
+            tag.title = tag.title + ' edited'
+        Tag.bulk_save(None, tags, message='edit')
+
+        self.assertEqual(12, Tag.objects.count())
+        self.assertEqual(14, Tag.objects_revisions.count())
+        for tag in tags:
+            retrived_tag = Tag.objects.get(document_id=tag.document_id)
+            self.assertEqual(retrived_tag, tag)
+            self.assertEqual(retrived_tag.revision.index, 2)
+            self.assertEqual(retrived_tag.revision.message, 'edit')
+            self.assertEqual(retrived_tag.revision.type, 'change')
+            self.assertEqual(retrived_tag.document.revisions_count, 2)
+            self.assertEqual(retrived_tag.document.revision_tip_id,
+                             tag.revision_id)
+            self.assertEqual(retrived_tag.revision.parent_id,
+                             retrived_tag.document.revision_created_id)
+
+    def test_save_revision_index_and_tip(self):
+        tag = Tag(title='Tag', slug='tag')
+        tag.save(request=None)
+
+        queries = []
+        for i in range(4):
+            tag.title = 'Tag %d' % i
+            with CaptureQueriesContext(connection) as ctx:
+                tag.save(request=None)
+            queries.append(len(ctx.captured_queries))
+
+        # saving does not get slower as history grows
+        self.assertEqual(len(set(queries)), 1)
+
+        revisions = Tag.objects_revisions.filter(
+            document_id=tag.document_id).order_by('revision_id')
+        self.assertEqual([1, 2, 3, 4, 5],
+                         [t.revision.index for t in revisions])
+        self.assertEqual([None, None, None, None, True],
+                         [t.is_tip for t in revisions])
+        self.assertEqual(5, tag.document.revisions_count)
+
+    def test_as_of(self):
+        tag_1 = Tag(title='Tag 1', slug='tag-1')
+        tag_1.save(request=None)
+        created_at = tag_1.revision.created_at
+
+        tag_1.title = 'Tag 1 edited'
+        tag_1.save(request=None)
+        tag_2 = Tag(title='Tag 2', slug='tag-2')
+        tag_2.save(request=None)
+        edited_at = tag_2.revision.created_at
+
+        tag_1.delete(request=None)
+
+        self.assertEqual(['Tag 1'], [
+            t.title for t in Tag.objects.as_of(created_at)])
+        self.assertEqual(['Tag 1 edited', 'Tag 2'], [
+            t.title for t in Tag.objects.as_of(edited_at)])
+        self.assertEqual(['Tag 2'], [
+            t.title for t in Tag.objects.as_of(timezone.now())])
+
+    def test_archive(self):
+        tag = Tag(title='Tag', slug='tag')
+        tag.save(request=None)
+        first_id = tag.revision_id
+        tag.title = 'Tag edited'
+        tag.save(request=None)
+
+        create_archive(Tag)
+        self.assertTrue(has_archive(Tag))
+        self.assertEqual(archive_revisions(Tag, [first_id]), 1)
+        # archived rows are still read through the parent table
+        self.assertEqual(
+            Tag.objects_revisions.get(pk=first_id).title, 'Tag')
+        self.assertEqual(restore_revisions(Tag, [first_id]), 1)
+
+    def test_revision_diff(self):
+        tag = Tag(title='Tag', slug='tag')
+        tag.save(request=None)
+        page = Page(title='Example', slug='example')
+        page.save(request=None)
+
+        page.title = 'Title updated'
+        page.save(request=None)
+        page.tags.add(tag.document)
+
+        self.assertEqual(get_revision_diff(page.revision), [
+            {'field': 'title', 'old': 'Example', 'new': 'Title updated'},
+            {'field': 'tags', 'added': [tag.document_id], 'removed': []},
+        ])
+
+    def test_m2m_values(self):
+        tag = Tag(title='Tag', slug='tag')
+        tag.save(request=None)
+        page = Page(title='Example', slug='example')
+        page.save(request=None)
+        revision_ids = [page.pk]
+        page.tags.add(tag.document)
+        for i in range(3):
+            page.save(request=None)
+            revision_ids.append(page.pk)
+
+        # one query for all the revisions
+        with CaptureQueriesContext(connection) as ctx:
+            values = get_m2m_values(Page, revision_ids)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(values[revision_ids[0]], {'tags': {tag.document_id}})
+        self.assertEqual(values[revision_ids[-1]],
+                         {'tags': {tag.document_id}})
+
+    @override_settings(REVISION_FEED_LAG=0)
+    def test_revision_feed(self):
+        tag = Tag(title='Tag', slug='tag')
+        tag.save(request=None)
+        tag.title = 'Tag edited'
+        tag.save(request=None)
+        first_id = tag.document.revision_created_id
+
+        events = list(iter_events(after_id=first_id - 1, batch_size=1))
+        self.assertEqual(['create', 'change'],
+                         [e['type'] for e in events])
+        self.assertEqual('tests.tag', events[0]['content_type'])
+        self.assertEqual('Tag', events[0]['object']['title'])
+        self.assertEqual('Tag edited', events[1]['object']['title'])
+
+        # resumes after the last event received
+        self.assertEqual([], list(iter_events(after_id=events[-1]['id'])))
+
+        response = self.client.get('/revisions/feed', {
+            'after': first_id - 1,
+            'limit': 1,
+        })
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(1, len(lines))
+
+        # transactions still running may commit lower ids later
+        self.assertEqual([], list(iter_events(after_id=first_id - 1,
+                                              lag=60)))
+
+        # only public documents are served over HTTP
+        tag.document.privacy = PRIVACY_PRIVATE
+        tag.document.save(update_fields=['privacy'])
+        response = self.client.get('/revisions/feed', {
+            'after': first_id - 1,
+        })
+        self.assertEqual(b'', b''.join(response.streaming_content))
+
+    def test_m2m_copy_forward(self):
+        tag = Tag(title='Tag', slug='tag')
+        tag.save(request=None)
+        page = Page(title='Example', slug='example')
+        page.save(request=None)
+        page.tags.add(tag.document)
+        created_revision_id = page.revision_id
+
+        page.title = 'Title updated'
+        page.save(request=None)
+        self.assertNotEqual(created_revision_id, page.revision_id)
+        self.assertEqual([tag.document], list(page.tags.all()))
+
+        Page.bulk_save(None, [page])
+        self.assertEqual([tag.document], list(page.tags.all()))
+
+    def test_visible_to(self):
+        tags = {}
+        for privacy in ('public', 'friends', 'private'):
+            tag = Tag(title=privacy, slug=privacy)
+            tag.save(request=None)
+            tags[privacy] = tag
+        for privacy, value in (('friends', PRIVACY_FRIENDS),
+                               ('private', PRIVACY_PRIVATE)):
+            document = tags[privacy].document
+            document.owner = self.user.document
+            document.privacy = value
+            document.save(update_fields=['owner', 'privacy'])
+
+        def visible(user):
+            return sorted(t.title for t in Tag.objects.visible_to(user))
+
+        self.assertEqual(['friends', 'private', 'public'], visible(self.user))
+        self.assertEqual(['public'], visible(self.user_2))
+
+        Friendship.befriend(self.user.document, self.user_2.document)
+        self.assertEqual(['friends', 'public'], visible(self.user_2))
+
+        Friendship.unfriend(self.user_2.document, self.user.document)
+        self.assertEqual(['public'], visible(self.user_2))
+
+    def test_count_strategies(self):
+        for i in range(3):
+            Tag(title='Tag %d' % i, slug='tag-%d' % i).save(request=None)
+        queryset = Tag.objects.all()
+
+        self.assertEqual(count_queryset(queryset), (3, EXACT))
+
+        self.assertEqual(count_queryset(queryset, CACHED), (3, EXACT))
+        self.assertEqual(count_queryset(queryset, CACHED), (3, CACHED))
+        invalidate_counts(Tag)
+        self.assertEqual(count_queryset(queryset, CACHED), (3, EXACT))
+
+        # counts are also keyed by the models they join
+        joined = Tag.objects.filter(document__privacy=PRIVACY_PUBLIC)
+        self.assertEqual(count_queryset(joined, CACHED), (3, EXACT))
+        self.assertEqual(count_queryset(joined, CACHED), (3, CACHED))
+        invalidate_counts(DocumentID)
+        self.assertEqual(count_queryset(joined, CACHED), (3, EXACT))
+
+        # below the threshold estimates fall back to an exact count
+        with self.settings(COUNT_ESTIMATE_THRESHOLD=10 ** 9):
+            self.assertEqual(count_queryset(queryset, ESTIMATED), (3, EXACT))
+        with self.settings(COUNT_ESTIMATE_THRESHOLD=0):
+            count, strategy = count_queryset(queryset, ESTIMATED)
+            self.assertEqual(strategy, ESTIMATED)
+
+
+class DiffCacheTest(TransactionTestCase):
+    def test_in_place_save(self):
+        page = Page(title='Example', slug='example')
+        page.save(request=None)
+        page.title = 'Title updated'
+        page.save(request=None)
+        self.assertEqual(get_revision_diff(page.revision), [
+            {'field': 'title', 'old': 'Example', 'new': 'Title updated'},
+        ])
+
+        # rows changed in place drop the cached diffs they are part of
+        page.title = 'Title fixed'
+        page.save(request=None, update_fields=['title'])
+        self.assertEqual(get_revision_diff(page.revision), [
+            {'field': 'title', 'old': 'Example', 'new': 'Title fixed'},
+        ])
+
+
+class ObjectCacheTest(TransactionTestCase):
+    def setUp(self):
+        object_cache.local.clear()
+        caches[settings.OBJECT_CACHE].clear()
+
+    def test_tip_cache(self):
+        tag = Tag(title='Tag', slug='tag')
+        tag.save(request=None)
+
+        Tag.objects.get(document_id=tag.document_id)
+        with CaptureQueriesContext(connection) as ctx:
+            cached = Tag.objects.get(document_id=tag.document_id)
+            self.assertEqual(cached.title, 'Tag')
+            self.assertEqual(Tag.objects.get(slug='tag').title, 'Tag')
+            self.assertEqual(tag.document.get_object().title, 'Tag')
+        # the slug lookup goes to the database once to learn its document
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(Tag.objects.get(slug='tag').title, 'Tag')
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        # a new revision drops the document's tip pointer
+        cached.title = 'Tag updated'
+        cached.save(request=None)
+        self.assertEqual(
+            Tag.objects.get(document_id=tag.document_id).title, 'Tag updated')
+        self.assertEqual(Tag.objects.get(slug='tag').title, 'Tag updated')
+
+        # inside transactions the database is always read
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as ctx:
+                Tag.objects.get(document_id=tag.document_id)
+            self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_in_place_save(self):
+        tag = Tag(title='Tag', slug='tag')
+        tag.save(request=None)
+        first_revision_id = tag.revision_id
+        self.assertEqual(tag.document.get_object().title, 'Tag')
+
+        # rows saved in place are read again
+        tag.title = 'Tag fixed'
+        tag.save(request=None, update_fields=['title'])
+        tag.document.refresh_from_db()
+        self.assertEqual(tag.document.get_object().title, 'Tag fixed')
+
+        # as is the previous tip of a new revision
+        revisions = Tag.objects_revisions.all()
+        object_cache.get_revision(revisions, first_revision_id)
+        tag.save(request=None)
+        previous = object_cache.get_revision(revisions, first_revision_id)
+        self.assertIsNone(previous.is_tip)
+
+    def test_timeout(self):
+        # without the invalidation bus other processes aren't told about
+        # changes, so entries expire
+        with self.settings(INVALIDATION_BUS=False, OBJECT_CACHE_TIMEOUT=0):
+            object_cache.cache_set('key', 1)
+            self.assertIsNone(object_cache.cache_get('key'))
+        with self.settings(INVALIDATION_BUS=True, OBJECT_CACHE_TIMEOUT=0):
+            object_cache.cache_set('key', 1)
+            self.assertEqual(object_cache.cache_get('key'), 1)
+
+    def test_lazy_size(self):
+        with self.settings(OBJECT_CACHE_SIZE=1):
+            object_cache.local.set('a', 1)
+            object_cache.local.set('b', 2)
+            self.assertIsNone(object_cache.local.get('a'))
+            self.assertEqual(object_cache.local.get('b'), 2)
+
+
+class InvalidationTest(TransactionTestCase):
+    def setUp(self):
+        object_cache.local.clear()
+
+    def test_coalesce(self):
+        payloads = list(get_payloads(Tag, {1: 10, 2: None}))
+        payloads += list(get_payloads(Tag, {1: 11}))
+        self.assertEqual(coalesce(payloads), {Tag: {1: 11, 2: None}})
+        # events of the same process were already handled
+        self.assertEqual(coalesce(payloads, os.getpid()), {})
+
+    def test_remote_change(self):
+        caches[settings.OBJECT_CACHE].clear()
+        tag = Tag(title='Tag', slug='tag')
+        tag.save(request=None)
+        stale_revision_id = tag.revision_id
+        Tag.objects.get(document_id=tag.document_id)
+
+        tag.title = 'Tag updated'
+        tag.save(request=None)
+        # another process cached the old tip in its local tiers, here a
+        # LocMemCache, before the change
+        object_cache.cache_set(object_cache.tip_key(tag.document_id),
+                               stale_revision_id)
+        self.assertEqual(
+            Tag.objects.get(document_id=tag.document_id).title, 'Tag')
+
+        listener = Listener()
+        listener.pid = None
+        listener.dispatch(list(get_payloads(
+            Tag, {tag.document_id: tag.revision_id})))
+        self.assertEqual(
+            Tag.objects.get(document_id=tag.document_id).title, 'Tag updated')
+        document = DocumentID.objects.get(pk=tag.document_id)
+        self.assertEqual(document.get_object().title, 'Tag updated')
+
+    @override_settings(INVALIDATION_BUS=False)
+    def test_listener_disabled(self):
+        with self.assertLogs('db.invalidation', 'WARNING'):
+            self.assertIsNone(start_listener())
+
+    @override_settings(INVALIDATION_BUS=True)
+    def test_listener(self):
+        tag = Tag(title='Tag', slug='tag')
+        tag.save(request=None)
+        Tag.objects.get(document_id=tag.document_id)
+        key = object_cache.tip_key(tag.document_id)
+        self.assertEqual(object_cache.local.get(key), tag.revision_id)
+
+        listener = Listener(delay=0.01, timeout=0.1)
+        # handle the events of this process as if they were remote
+        listener.pid = None
+        listener.start()
+        try:
+            self.assertTrue(listener.listening.wait(5))
+            publish(Tag, {tag.document_id: tag.revision_id})
+            deadline = time.time() + 5
+            while object_cache.local.get(key) is not None and \
+                    time.time() < deadline:
+                time.sleep(0.01)
+            self.assertIsNone(object_cache.local.get(key))
+        finally:
+            listener.stop()
+            listener.join()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=10)
+class ReplicaRouterTest(SimpleTestCase):
+    def test_routing(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Tag))
+        with use_replica():
+            self.assertEqual(router.db_for_read(Tag), 'replica')
+            self.assertEqual(router.db_for_write(Tag), 'default')
+        with use_replica(False):
+            self.assertIsNone(router.db_for_read(Tag))
+            # pinned sessions count on the primary too
+            self.assertEqual(aggregate_db(), 'default')
+        self.assertIsNone(router.db_for_read(Tag))
+
+        # aggregates read from the replica unless writing
+        self.assertEqual(aggregate_db(), 'replica')
+        with mock.patch.object(connection, 'in_atomic_block', True):
+            self.assertEqual(aggregate_db(), 'default')
+
+    def test_pinning(self):
+        request = RequestFactory().post('/graphql')
+        request.session = {}
+        self.assertFalse(is_pinned(request))
+        pin_primary(request)
+        self.assertTrue(is_pinned(request))
+
+        with self.settings(REPLICA_PIN_SECONDS=0):
+            pin_primary(request)
+            self.assertFalse(is_pinned(request))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaCacheTest(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        caches['default'].clear()
+        Tag(title='Tag', slug='tag').save(request=None)
+
+    def test_cached_count(self):
+        with use_replica(), \
+                CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            self.assertEqual(count_queryset(Tag.objects.all(), CACHED),
+                             (1, EXACT))
+            self.assertEqual(count_queryset(Tag.objects.all(), EXACT),
+                             (1, EXACT))
+        # the cached count is filled from the primary
+        self.assertEqual(len(primary.captured_queries), 1)
+        self.assertEqual(len(replica.captured_queries), 1)
+
+        with use_replica(False), \
+                CaptureQueriesContext(connections['replica']) as replica:
+            self.assertEqual(count_queryset(Tag.objects.all(), EXACT),
+                             (1, EXACT))
+        self.assertEqual(len(replica.captured_queries), 0)
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+from db.operations import AddTipIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0011_auto_20190812_1246'),
+        ('voting', '0004_auto_20190812_1246'),
+    ]
+
+    operations = [
+        AddTipIndex('vote'),
+    ]
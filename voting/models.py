@@ -61,6 +61,7 @@ def update_num_votes(vote):
         date=stats.document.revision_created.created_at
     )
     stats.save()
+    stats.document.send_changed()
 
 
 def add_reputation(vote):
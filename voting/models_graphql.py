@@ -1,10 +1,11 @@
 import graphene
 from graphene.relay import Node
-from graphene_django import DjangoObjectType, DjangoConnectionField
+from graphene_django import DjangoObjectType
 
 from db.models import DocumentID
 from db.types_revision import DocumentNode, DocumentBase
-from db.graphene import CountedConnection
+from db.graphene import CountedConnection, DjangoConnectionField
+from db.loaders import get_loaders, load_tip
 from accounts.models_graphql import User
 
 from .models import Vote as VoteModel, VoteStats
@@ -48,9 +49,16 @@ class Voting(graphene.ObjectType):
 
     def stats(self):
         if not hasattr(self, '_stats'):
-            self._stats, created = VoteStats.objects.get_or_create(
-                document_id=self._document.pk
-            )
+            # loaded with select_related by db.optimizer, documents without
+            # a stats row yet are read as zeros
+            related = VoteStats._meta.get_field('document').remote_field
+            if related.is_cached(self._document):
+                self._stats = related.get_cached_value(self._document) or \
+                    VoteStats(document_id=self._document.pk)
+            else:
+                self._stats, created = VoteStats.objects.get_or_create(
+                    document_id=self._document.pk
+                )
         return self._stats
 
     def resolve_count(self, info):
@@ -70,9 +78,11 @@ class VotesNode(graphene.Interface):
     voting = graphene.Field(Voting)
 
     def resolve_voting(self, info):
-        c = Voting(id=self.document.pk)
-        c._document = self.document
-        return c
+        def voting(document):
+            c = Voting(id=document.pk)
+            c._document = document
+            return c
+        return get_loaders(info.context).document(self).then(voting)
 
 
 class Vote(DjangoObjectType, DocumentBase):
@@ -84,5 +94,4 @@ class Vote(DjangoObjectType, DocumentBase):
         connection_class = CountedConnection
 
     def resolve_author(self, info):
-        if self.author_id:
-            return User._meta.model.objects.get(document_id=self.author_id)
+        return load_tip(info, User._meta.model, self.author_id)
@@ -3,15 +3,14 @@ from graphql_relay.node.node import from_global_id
 
 from accounts.decorators import login_required
 from accounts.permissions import has_permission
-from db.models_graphql import Document
+from db.models_graphql import get_parent_document
 from backend.mutations import Mutation
 from .models import Vote as VoteModel
 from .models_graphql import Vote, Voting
 
 
 def _set_vote(input, request, info):
-    gid_type, gid = from_global_id(input.get('parent'))
-    parent = Document._meta.model.objects.get(pk=gid)
+    parent = get_parent_document(input.get('parent'))
 
     try:
         vote = VoteModel.objects.get(parent=parent,
@@ -22,7 +21,7 @@ def _set_vote(input, request, info):
     vote.value = input.get('value')
     vote.save(request=request)
 
-    voting = Voting.get_node(info, id=gid)
+    voting = Voting.get_node(info, id=parent.pk)
 
     return {
         'vote': vote,